@@ -0,0 +1,69 @@
+"""Общая подготовка окружения для бенчмарков.
+
+Бенчмарки запускаются из корня репозитория, например:
+    python -m benchmarks.fanout
+и работают с отдельной тестовой базой, рабочая база не трогается.
+"""
+import gc
+import os
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+
+PROJECT_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'yatube')
+
+
+def setup_django() -> None:
+    """Настраивает Django и создает тестовую базу."""
+    if PROJECT_DIR not in sys.path:
+        sys.path.insert(0, PROJECT_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+    import django
+    django.setup()
+
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+    # С DEBUG Django запоминает каждый запрос: это замедляет замеры
+    # и переполняет журнал, по которому считает CaptureQueriesContext.
+    setup_test_environment(debug=False)
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+
+
+@contextmanager
+def rollback():
+    """Откатывает все изменения базы внутри блока."""
+    from django.db import transaction
+
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def timed(func, repeat: int, setup=None) -> list:
+    """Время каждого из repeat вызовов func в миллисекундах.
+
+    setup вызывается перед каждым вызовом и в замер не входит.
+    Сборщик мусора на время замеров отключается, как в timeit.
+    """
+    timings = []
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+    finally:
+        gc.enable()
+    return timings
+
+
+def percentile(timings: list, percent: int) -> float:
+    if len(timings) == 1:
+        return timings[0]
+    return statistics.quantiles(timings, n=100)[percent - 1]
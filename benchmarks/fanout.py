@@ -0,0 +1,85 @@
+"""Стоимость записи и чтения ленты подписок в режимах push и pull.
+
+Для каждого числа подписчиков автора измеряет время публикации поста
+и время чтения первой страницы ленты подписчика, когда посты автора
+раскладываются по лентам (push) и когда подтягиваются при чтении (pull).
+
+    python -m benchmarks.fanout --followers 10 100 1000 10000
+"""
+import argparse
+
+from benchmarks.common import percentile, rollback, setup_django, timed
+
+READ_FOLLOWINGS = 50
+POSTS_PER_AUTHOR = 20
+
+
+def run(follower_counts: list, repeat: int) -> list:
+    from django.test import override_settings
+
+    from posts.counters import rebuild_user_stats
+    from posts.feeds import pull_popular_authors, timeline_posts
+    from posts.models import Follow, Post, User
+    from posts.views import COUNT_POST_ON_PAGE
+
+    results = []
+    for followers in follower_counts:
+        for mode, limit in (('push', followers), ('pull', followers - 1)):
+            with rollback(), override_settings(
+                    POSTS_FANOUT_FOLLOWER_LIMIT=limit):
+                author = User.objects.create(username='author')
+                # SQLite не возвращает pk из bulk_create, читаем их заново.
+                User.objects.bulk_create(
+                    User(username=f'reader{i}') for i in range(followers))
+                User.objects.bulk_create(
+                    User(username=f'other{i}')
+                    for i in range(READ_FOLLOWINGS))
+                readers = User.objects.filter(username__startswith='reader')
+                Follow.objects.bulk_create(
+                    Follow(user_id=user_id, author=author)
+                    for user_id in readers.values_list('pk', flat=True))
+                reader = readers.first()
+                rebuild_user_stats(User.objects.filter(pk=author.pk))
+                pull_popular_authors([author.pk])
+                for other in User.objects.filter(
+                        username__startswith='other'):
+                    Follow.objects.create(user=reader, author=other)
+                    for _ in range(POSTS_PER_AUTHOR):
+                        Post.objects.create(author=other, text='Пост')
+
+                write = timed(
+                    lambda: Post.objects.create(author=author, text='Пост'),
+                    repeat)
+                read = timed(
+                    lambda: list(
+                        timeline_posts(reader)[:COUNT_POST_ON_PAGE]),
+                    repeat)
+            results.append({
+                'followers': followers,
+                'mode': mode,
+                'write_p50_ms': percentile(write, 50),
+                'write_p95_ms': percentile(write, 95),
+                'read_p50_ms': percentile(read, 50),
+                'read_p95_ms': percentile(read, 95),
+            })
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--followers', type=int, nargs='+',
+                        default=[10, 100, 1000, 10000])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    print(f'{"followers":>10} {"mode":>5} {"write p50":>10} '
+          f'{"write p95":>10} {"read p50":>9} {"read p95":>9}')
+    for row in run(args.followers, args.repeat):
+        print(f'{row["followers"]:>10} {row["mode"]:>5} '
+              f'{row["write_p50_ms"]:>8.2f}ms {row["write_p95_ms"]:>8.2f}ms '
+              f'{row["read_p50_ms"]:>7.2f}ms {row["read_p95_ms"]:>7.2f}ms')
+
+
+if __name__ == '__main__':
+    main()
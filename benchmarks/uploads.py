@@ -0,0 +1,93 @@
+"""Пиковая память при разборе и проверке загрузки картинки поста.
+
+Для каждого размера файла разбирает запрос с картинкой и проверяет
+PostForm с обработчиками загрузки из настроек и с обработчиками
+Django по умолчанию. Память считается tracemalloc без самого запроса,
+файлы больше FILE_UPLOAD_MAX_MEMORY_SIZE держатся на диске.
+
+    python -m benchmarks.uploads --sizes 1 5 20
+"""
+import argparse
+import os
+import tracemalloc
+from io import BytesIO
+
+from benchmarks.common import setup_django
+
+DJANGO_HANDLERS = [
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+
+def image_content(megabytes: int) -> bytes:
+    """PNG из шума: такая картинка почти не сжимается."""
+    from PIL import Image
+
+    side = int((megabytes * 1024 * 1024) ** 0.5)
+    content = BytesIO()
+    Image.frombytes('L', (side, side), os.urandom(side * side)).save(
+        content, 'png', compress_level=0)
+    return content.getvalue()
+
+
+def peak_memory(content: bytes) -> tuple:
+    """Пиковая память в байтах и принят ли файл."""
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from django.test import RequestFactory
+
+    from posts.forms import PostForm
+
+    request = RequestFactory().post('/', {
+        'text': 'Пост',
+        'image': SimpleUploadedFile('image.png', content, 'image/png'),
+    })
+    tracemalloc.start()
+    try:
+        form = PostForm(request.POST, files=request.FILES)
+        valid = form.is_valid()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+        for file in request.FILES.values():
+            file.close()
+    return peak, valid
+
+
+def run(sizes: list) -> list:
+    from django.conf import settings
+    from django.test import override_settings
+
+    # Первый разбор загружает модули и плагины Pillow, в замер он не идет.
+    peak_memory(image_content(1))
+    results = []
+    for megabytes in sizes:
+        content = image_content(megabytes)
+        for handlers, name in ((settings.FILE_UPLOAD_HANDLERS, 'streamed'),
+                               (DJANGO_HANDLERS, 'django')):
+            with override_settings(FILE_UPLOAD_HANDLERS=handlers,
+                                   POSTS_IMAGE_MAX_BYTES=len(content)):
+                peak, valid = peak_memory(content)
+            results.append({
+                'size_mb': len(content) / 1024 / 1024,
+                'handlers': name,
+                'peak_kb': peak / 1024,
+                'valid': valid,
+            })
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 5, 20])
+    args = parser.parse_args()
+
+    setup_django()
+    print(f'{"size":>8} {"handlers":>9} {"peak":>10} {"valid":>6}')
+    for row in run(args.sizes):
+        print(f'{row["size_mb"]:>6.1f}MB {row["handlers"]:>9} '
+              f'{row["peak_kb"]:>8.0f}KB {str(row["valid"]):>6}')
+
+
+if __name__ == '__main__':
+    main()
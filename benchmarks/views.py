@@ -0,0 +1,219 @@
+"""Время ответа, число запросов и размер страниц posts на разных объемах.
+
+Для каждого размера базы заполняет ее командой seed и открывает
+каждый адрес из posts/urls.py. Итоги сравниваются с сохраненными
+в baselines/views.json, регрессии сверх допуска выводятся отдельно,
+и тогда бенчмарк завершается с кодом 1.
+
+    python -m benchmarks.views --sizes 1000 10000
+    python -m benchmarks.views --save
+"""
+import argparse
+import json
+import os
+import sys
+from io import StringIO
+
+from benchmarks.common import percentile, rollback, setup_django, timed
+
+BASELINE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'baselines', 'views.json')
+USERS_PER_POST = 0.01
+FOLLOWS_PER_USER = 5
+RANDOM_SEED = 1
+WARMUP = 2
+
+
+def seed(size: int) -> None:
+    from django.core.management import call_command
+
+    users = max(int(size * USERS_PER_POST), 10)
+    call_command(
+        'seed', users=users, posts=size, comments=size,
+        follows=users * FOLLOWS_PER_USER, random_seed=RANDOM_SEED,
+        stdout=StringIO())
+
+
+def cases() -> list:
+    """Адреса posts/urls.py на засеянных данных: (имя, метод, адрес,
+    данные, от чьего имени, подготовка перед каждым запросом)."""
+    from django.db.models import Count
+    from django.urls import reverse
+
+    from posts.models import Follow, Group, Post, User
+    from posts.views import COUNT_POST_ON_PAGE
+
+    author = User.objects.order_by('-stats__followers_count').first()
+    reader = User.objects.order_by('-stats__following_count').first()
+    group = Group.objects.annotate(
+        posts_count=Count('posts')).order_by('-posts_count').first()
+    post = Post.objects.filter(author=author).order_by(
+        '-comments_count').first()
+    last_page = Post.objects.count() // COUNT_POST_ON_PAGE + 1
+    # Подписка меняет данные, поэтому подписывается отдельный читатель,
+    # и перед каждым запросом подписка возвращается в исходное состояние.
+    stranger = User.objects.create(username='benchmark-stranger')
+
+    def unfollow():
+        Follow.objects.filter(user=stranger, author=author).delete()
+
+    def follow():
+        Follow.objects.get_or_create(user=stranger, author=author)
+
+    return [
+        ('index', 'get', reverse('posts:index'), {}, None, None),
+        ('index last page', 'get', reverse('posts:index'),
+         {'page': last_page}, None, None),
+        ('group_list', 'get',
+         reverse('posts:group_list', kwargs={'slug': group.slug}),
+         {}, None, None),
+        ('profile', 'get',
+         reverse('posts:profile', kwargs={'username': author.username}),
+         {}, None, None),
+        ('post_detail', 'get',
+         reverse('posts:post_detail', kwargs={'post_id': post.pk}),
+         {}, None, None),
+        ('search', 'get', reverse('posts:search'),
+         {'q': post.text.split()[0]}, None, None),
+        ('follow_index', 'get', reverse('posts:follow_index'), {},
+         reader, None),
+        ('post_create', 'get', reverse('posts:post_create'), {},
+         author, None),
+        ('post_edit', 'get',
+         reverse('posts:post_edit', kwargs={'post_id': post.pk}),
+         {}, author, None),
+        ('add_comment', 'post',
+         reverse('posts:add_comment', kwargs={'post_id': post.pk}),
+         {'text': 'Комментарий'}, reader, None),
+        ('profile_follow', 'get',
+         reverse('posts:profile_follow',
+                 kwargs={'username': author.username}), {},
+         stranger, unfollow),
+        ('profile_unfollow', 'get',
+         reverse('posts:profile_unfollow',
+                 kwargs={'username': author.username}), {},
+         stranger, follow),
+    ]
+
+
+def measure(size: int, repeat: int, warm: bool) -> dict:
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+
+    results = {}
+    with rollback():
+        seed(size)
+        for name, method, url, data, user, prepare in cases():
+            client = Client()
+            if user is not None:
+                client.force_login(user)
+
+            def request():
+                return getattr(client, method)(url, data)
+
+            def setup():
+                if prepare is not None:
+                    prepare()
+                if not warm:
+                    cache.clear()
+
+            for _ in range(WARMUP):
+                setup()
+                request()
+            setup()
+            with CaptureQueriesContext(connection) as queries:
+                response = request()
+            # Следующие запросы очищают журнал, число берется сразу.
+            count = len(queries)
+            timings = timed(request, repeat, setup)
+            results[f'{size}:{name}'] = {
+                'p50_ms': round(percentile(timings, 50), 3),
+                'p95_ms': round(percentile(timings, 95), 3),
+                'queries': count,
+                'bytes': len(response.content),
+            }
+    return results
+
+
+def regressions(results: dict, baseline: dict, tolerance: float,
+                min_delta: float) -> dict:
+    """Замеры хуже базовых.
+
+    Медиана времени и размер ответа сверяются с допуском, число
+    запросов не должно расти вовсе. Медиана считается ухудшившейся,
+    только если выросла и больше чем на min_delta миллисекунд: на быстрых
+    страницах шум больше допуска. p95 при паре десятков повторов почти
+    совпадает с максимумом, поэтому только выводится.
+    """
+    found = {}
+    for key, row in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        worse = []
+        if row['p50_ms'] > max(base['p50_ms'] * (1 + tolerance),
+                               base['p50_ms'] + min_delta):
+            worse.append('p50_ms')
+        if row['queries'] > base['queries']:
+            worse.append('queries')
+        if row['bytes'] > base['bytes'] * (1 + tolerance):
+            worse.append('bytes')
+        if worse:
+            found[key] = worse
+    return found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[1000, 10000])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument(
+        '--tolerance', type=float, default=0.25,
+        help='Допустимое ухудшение медианы и размера, доля от базового.')
+    parser.add_argument(
+        '--min-delta', type=float, default=2.0,
+        help='Минимальный рост медианы в мс, который считается регрессией.')
+    parser.add_argument(
+        '--warm', action='store_true',
+        help='Не сбрасывать кеш перед запросами.')
+    parser.add_argument(
+        '--save', action='store_true',
+        help='Сохранить результаты как базовые.')
+    args = parser.parse_args()
+
+    setup_django()
+    results = {}
+    for size in args.sizes:
+        results.update(measure(size, args.repeat, args.warm))
+
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, encoding='utf-8') as file:
+            baseline = json.load(file)
+    found = regressions(results, baseline, args.tolerance,
+                        args.min_delta)
+
+    print(f'{"size:url":<28} {"p50":>9} {"p95":>9} {"queries":>8} '
+          f'{"bytes":>8}')
+    for key, row in results.items():
+        mark = ' ' + ', '.join(found[key]) if key in found else ''
+        print(f'{key:<28} {row["p50_ms"]:>7.2f}ms {row["p95_ms"]:>7.2f}ms '
+              f'{row["queries"]:>8} {row["bytes"]:>8}{mark}')
+
+    if args.save:
+        baseline.update(results)
+        os.makedirs(os.path.dirname(BASELINE_PATH), exist_ok=True)
+        with open(BASELINE_PATH, 'w', encoding='utf-8') as file:
+            json.dump(baseline, file, indent=2, sort_keys=True)
+            file.write('\n')
+        print(f'Базовые результаты сохранены в {BASELINE_PATH}')
+    elif found:
+        print(f'Регрессии сверх {args.tolerance:.0%}: {len(found)}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,10 @@
+import pytest
+
+from core.testing import strict_query_budgets
+
+
+@pytest.fixture(autouse=True)
+def query_budget_strict():
+    """Превышение бюджета запросов роняет тесты и под pytest."""
+    with strict_query_budgets():
+        yield
@@ -0,0 +1,116 @@
+import hashlib
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+TAG_KEY: str = 'core:tag:{}'
+PAGE_KEY: str = 'core:page:{}'
+
+
+def tag_versions(tags) -> dict:
+    """Текущие версии тегов. Неизвестным тегам назначается версия."""
+    keys = {TAG_KEY.format(tag): tag for tag in tags}
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        now = time.time()
+        for key in missing:
+            cache.add(key, now, None)
+        versions.update(cache.get_many(missing))
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def invalidate_tags(*tags) -> None:
+    """Сбрасывает все кешированные страницы, помеченные этими тегами."""
+    now = time.time()
+    cache.set_many({TAG_KEY.format(tag): now for tag in tags}, None)
+
+
+def tag_response(response, *tags):
+    """Помечает ответ тегами данных, из которых он собран."""
+    response.cache_tags = getattr(response, 'cache_tags', set()) | set(tags)
+    return response
+
+
+def anonymous_cache_page(view_func):
+    """Кеширует страницу целиком для анонимных посетителей.
+
+    Ключ строится по пути и строке запроса. Вместе со страницей
+    хранятся версии ее тегов (см. tag_response), и страница
+    считается устаревшей, как только версия любого тега изменилась.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        timeout = settings.ANONYMOUS_PAGE_CACHE_TIMEOUT
+        if (not timeout or request.method not in ('GET', 'HEAD')
+                or request.user.is_authenticated):
+            return view_func(request, *args, **kwargs)
+
+        path = request.get_full_path().encode()
+        key = PAGE_KEY.format(hashlib.md5(path).hexdigest())
+        entry = cache.get(key)
+        if entry is not None:
+            versions, response = entry
+            if tag_versions(versions) == versions:
+                return response
+
+        response = view_func(request, *args, **kwargs)
+        tags = getattr(response, 'cache_tags', None)
+        if (response.status_code == 200 and tags
+                and not response.streaming and not response.cookies):
+            cache.set(key, (tag_versions(tags), response), timeout)
+        return response
+    return wrapper
+
+
+def conditional_page(validator):
+    """Отвечает 304 на повторный запрос неизменившейся страницы.
+
+    validator(*args, **kwargs) получает аргументы вьюхи и одним дешевым
+    запросом возвращает теги страницы и дату ее последнего поста
+    или None, если страницы нет. ETag строится из версий тегов,
+    даты и пользователя. Last-Modified, самая поздняя из них
+    с округлением вверх до секунды, отдается только страницам
+    без данных посетителя и только когда эта секунда прошла:
+    иначе правка в ту же секунду не изменила бы его.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            validated = None
+            if request.method in ('GET', 'HEAD'):
+                validated = validator(*args, **kwargs)
+            if validated is None:
+                return view_func(request, *args, **kwargs)
+
+            tags, pub_date = validated
+            versions = tag_versions(tags)
+            modified = max(versions.values())
+            if pub_date is not None:
+                modified = max(modified, pub_date.timestamp())
+            state = repr((
+                sorted(versions.items()), pub_date, request.user.pk,
+                request.META.get('CSRF_COOKIE')))
+            etag = quote_etag(hashlib.md5(state.encode()).hexdigest())
+            last_modified = None
+            if (not request.user.is_authenticated
+                    and not request.META.get('CSRF_COOKIE')
+                    and math.ceil(modified) <= time.time()):
+                last_modified = math.ceil(modified)
+
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = view_func(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                response['ETag'] = etag
+                if last_modified is not None:
+                    response['Last-Modified'] = http_date(last_modified)
+            return response
+        return wrapper
+    return decorator
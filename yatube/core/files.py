@@ -0,0 +1,56 @@
+import re
+
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class FileRange:
+    """Часть открытого файла от его текущей позиции длиной length.
+
+    fileno() отдает дескриптор самого файла: сервер с wsgi.file_wrapper
+    (gunicorn) передает через os.sendfile ровно Content-Length байт
+    от текущей позиции, не читая их в Python. read() нужен только
+    серверам без sendfile.
+    """
+
+    def __init__(self, file, length: int):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size) if size else b''
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self) -> int:
+        return self.file.fileno()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def requested_range(request, etag: str, size: int):
+    """Первый и последний байт из заголовка Range или None,
+    если отдавать нужно весь файл.
+
+    Поддерживается один диапазон: на несколько диапазонов, ошибку
+    в заголовке и устаревший If-Range отдается весь файл, как
+    разрешает RFC 7233. Для диапазона за концом файла - ValueError.
+    """
+    match = RANGE.match(request.META.get('HTTP_RANGE', '').strip())
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if match is None or if_range is not None and if_range != etag:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        if not int(last):
+            raise ValueError('Пустой диапазон.')
+        return max(size - int(last), 0), size - 1
+    if last and int(last) < int(first):
+        return None
+    if int(first) >= size:
+        raise ValueError('Диапазон за концом файла.')
+    return int(first), min(int(last), size - 1) if last else size - 1
@@ -0,0 +1,93 @@
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('core.queries')
+
+
+class QueryBudgetExceeded(Exception):
+    """Страница выполнила больше запросов, чем позволяет ее бюджет."""
+
+
+def query_budget(budget: int):
+    """Объявляет, сколько запросов к базе может выполнить представление.
+
+    В бюджет входят и запросы сессии и пользователя.
+    """
+    def decorator(view_func):
+        view_func.query_budget = budget
+        return view_func
+    return decorator
+
+
+class QueryStats:
+    """Считает запросы, их время и повторы одного и того же SQL."""
+
+    def __init__(self):
+        self.statements = Counter()
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.statements[sql] += 1
+
+    @property
+    def count(self) -> int:
+        return sum(self.statements.values())
+
+    @property
+    def duplicates(self) -> int:
+        """Повторы SQL с другими параметрами, обычно это N+1."""
+        return self.count - len(self.statements)
+
+    def server_timing(self) -> str:
+        return (f'db;dur={self.duration * 1000:.1f};'
+                f'desc="{self.count} queries, '
+                f'{self.duplicates} duplicates"')
+
+
+class QueryBudgetMiddleware:
+    """Замеряет работу с базой за запрос и сверяет ее с бюджетом.
+
+    Итоги отдаются в заголовке Server-Timing. Превышение бюджета,
+    объявленного через query_budget, пишется в лог, а при
+    QUERY_BUDGET_STRICT приводит к исключению QueryBudgetExceeded.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = QueryStats()
+        request.query_budget = None
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(stats))
+            response = self.get_response(request)
+
+        timing = stats.server_timing()
+        if response.has_header('Server-Timing'):
+            timing = f'{response["Server-Timing"]}, {timing}'
+        response['Server-Timing'] = timing
+
+        budget = request.query_budget
+        if budget is not None and stats.count > budget:
+            message = (
+                f'{request.method} {request.path}: {stats.count} queries '
+                f'over budget of {budget}, {stats.duplicates} duplicates, '
+                f'{stats.duration * 1000:.1f} ms')
+            if getattr(settings, 'QUERY_BUDGET_STRICT', False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = getattr(view_func, 'query_budget', None)
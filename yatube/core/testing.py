@@ -0,0 +1,27 @@
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+
+def strict_query_budgets() -> override_settings:
+    """Настройки, с которыми страница, превысившая бюджет запросов,
+    роняет тест: исключение QueryBudgetExceeded тестовый клиент
+    пробрасывает в тест.
+
+    Включаются и раннером manage.py test, и фикстурой из conftest.py
+    для pytest.
+    """
+    return override_settings(QUERY_BUDGET_STRICT=True)
+
+
+class QueryBudgetRunner(DiscoverRunner):
+    """Тестовый раннер, который на время прогона включает
+    strict_query_budgets."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.query_budget_settings = strict_query_budgets()
+        self.query_budget_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.query_budget_settings.disable()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,131 @@
+'''
+[X] - без DEBUG адреса MEDIA_URL ведут на serve_file
+[X] - файл отдается открытым для sendfile, с ETag, Last-Modified
+      и Accept-Ranges
+[X] - Range отдает часть файла с позиции его дескриптора, ошибочный
+      и множественный Range - весь файл, диапазон за концом - 416
+[X] - совпавший If-None-Match дает 304, устаревший If-Range - весь файл
+[X] - файлы вне каталога, скрытые файлы и каталоги не отдаются
+[X] - с SENDFILE_HEADER отдача передается прокси
+'''
+import os
+import shutil
+import tempfile
+from http import HTTPStatus
+
+from django.conf import settings
+from django.http import Http404
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import resolve
+
+from ..views import serve_file
+
+CONTENT = b'0123456789'
+
+
+class ServeFileTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.root = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        os.makedirs(os.path.join(cls.root, 'posts'))
+        with open(os.path.join(cls.root, 'posts', 'image.png'), 'wb') as file:
+            file.write(CONTENT)
+        with open(os.path.join(cls.root, 'posts', '.upload-1'), 'wb'):
+            pass
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.root, ignore_errors=True)
+
+    def get(self, path='posts/image.png', **headers):
+        request = RequestFactory().get(f'/media/{path}', **headers)
+        response = serve_file(request, path, self.root)
+        self.addCleanup(response.close)
+        return response
+
+    def test_media_url(self):
+        """Без DEBUG адреса MEDIA_URL ведут на serve_file."""
+        self.assertIs(resolve('/media/posts/image.png').func, serve_file)
+
+    def test_whole_file(self):
+        """Файл отдается открытым, с длиной и ETag."""
+        response = self.get()
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertEqual(response['Content-Length'], str(len(CONTENT)))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('Last-Modified', response)
+        self.assertRegex(response['ETag'], r'^"a-[0-9a-f]+"$')
+        self.assertIsNotNone(response.file_to_stream.fileno())
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+
+    def test_ranges(self):
+        """Range отдает часть файла, начиная с позиции дескриптора."""
+        for header, expected, content_range in (
+                ('bytes=2-5', b'2345', 'bytes 2-5/10'),
+                ('bytes=7-', b'789', 'bytes 7-9/10'),
+                ('bytes=-3', b'789', 'bytes 7-9/10'),
+                ('bytes=8-100', b'89', 'bytes 8-9/10')):
+            with self.subTest(header=header):
+                response = self.get(HTTP_RANGE=header)
+                self.assertEqual(
+                    response.status_code, HTTPStatus.PARTIAL_CONTENT)
+                self.assertEqual(response['Content-Range'], content_range)
+                self.assertEqual(
+                    response['Content-Length'], str(len(expected)))
+                position = os.lseek(
+                    response.file_to_stream.fileno(), 0, os.SEEK_CUR)
+                self.assertEqual(position, expected[0] - ord('0'))
+                self.assertEqual(
+                    b''.join(response.streaming_content), expected)
+
+    def test_whole_file_for_unsupported_ranges(self):
+        """Ошибочный и множественный Range отдают весь файл."""
+        for header in ('bytes=0-1,4-5', 'lines=1-2', 'bytes=5-2'):
+            with self.subTest(header=header):
+                response = self.get(HTTP_RANGE=header)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertEqual(
+                    b''.join(response.streaming_content), CONTENT)
+
+    def test_unsatisfiable_range(self):
+        """Диапазон за концом файла дает 416."""
+        for header in ('bytes=10-', 'bytes=-0'):
+            with self.subTest(header=header):
+                response = self.get(HTTP_RANGE=header)
+                self.assertEqual(
+                    response.status_code,
+                    HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                self.assertEqual(response['Content-Range'], 'bytes */10')
+
+    def test_conditional_requests(self):
+        """If-None-Match дает 304, устаревший If-Range - весь файл."""
+        etag = self.get()['ETag']
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        response = self.get(HTTP_RANGE='bytes=0-1', HTTP_IF_RANGE='"old"')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        response = self.get(HTTP_RANGE='bytes=0-1', HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, HTTPStatus.PARTIAL_CONTENT)
+
+    def test_not_found(self):
+        """Файлы вне каталога, скрытые файлы и каталоги не отдаются."""
+        for path in ('../settings.py', 'posts/.upload-1', 'posts',
+                     'posts/missing.png'):
+            with self.subTest(path=path), self.assertRaises(Http404):
+                serve_file(RequestFactory().get('/'), path, self.root)
+
+    def test_sendfile_header(self):
+        """С SENDFILE_HEADER файл отдает прокси."""
+        with override_settings(SENDFILE_HEADER='X-Accel-Redirect'):
+            response = self.get()
+        self.assertEqual(response['X-Accel-Redirect'],
+                         '/protected/media/posts/image.png')
+        self.assertEqual(response.content, b'')
+        with override_settings(SENDFILE_HEADER='X-Sendfile'):
+            response = self.get()
+        self.assertEqual(response['X-Sendfile'],
+                         os.path.join(self.root, 'posts', 'image.png'))
@@ -0,0 +1,56 @@
+'''
+[X] - в ответе есть Server-Timing с числом запросов, повторов и временем
+[X] - превышение бюджета пишется в лог
+[X] - в строгом режиме превышение бюджета вызывает исключение
+[X] - тесты прогоняются в строгом режиме
+'''
+from http import HTTPStatus
+from unittest import mock
+
+from django.core.cache import cache
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts import views
+from posts.models import Post, User
+
+from ..middleware import QueryBudgetExceeded
+
+
+class QueryBudgetMiddlewareTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_server_timing_header(self):
+        """Итоги работы с базой отдаются в заголовке Server-Timing."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertRegex(
+            response['Server-Timing'],
+            r'^db;dur=\d+\.\d;desc="3 queries, 0 duplicates"$')
+
+    @override_settings(QUERY_BUDGET_STRICT=False)
+    def test_over_budget_is_logged(self):
+        """Превышение бюджета пишется в лог."""
+        with mock.patch.object(views.index, 'query_budget', 1):
+            with self.assertLogs('core.queries', 'WARNING') as logs:
+                response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertIn('GET /: 3 queries over budget of 1', logs.output[0])
+
+    @override_settings(QUERY_BUDGET_STRICT=True)
+    def test_over_budget_raises_in_strict_mode(self):
+        """В строгом режиме превышение бюджета вызывает исключение."""
+        with mock.patch.object(views.index, 'query_budget', 1):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(reverse('posts:index'))
+
+    def test_strict_mode_in_tests(self):
+        """Тесты прогоняются в строгом режиме."""
+        self.assertIs(settings.QUERY_BUDGET_STRICT, True)
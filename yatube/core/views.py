@@ -1,4 +1,17 @@
+import mimetypes
+import os
+import stat
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
 from django.shortcuts import render
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.encoding import escape_uri_path
+from django.utils.http import http_date
+
+from .files import FileRange, requested_range
 
 
 def page_not_found(request, exception):
@@ -15,3 +28,78 @@ def permission_denied(request, exception):
 
 def server_error(request):
     return render(request, 'core/500.html', status=500)
+
+
+def find_file(path: str, document_root: str) -> tuple:
+    """Полный путь и stat файла path или Http404.
+
+    Скрытые файлы, например недописанные загрузки, не отдаются.
+    """
+    try:
+        full_path = safe_join(document_root, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if any(part.startswith('.') for part in path.split('/')):
+        raise Http404
+    try:
+        file_stat = os.stat(full_path)
+    except OSError:
+        raise Http404
+    if not stat.S_ISREG(file_stat.st_mode):
+        raise Http404
+    return full_path, file_stat
+
+
+def sendfile_response(request, full_path: str, content_type: str):
+    """Пустой ответ, по заголовку которого файл отдает прокси."""
+    response = HttpResponse(content_type=content_type)
+    response[settings.SENDFILE_HEADER] = (
+        full_path if settings.SENDFILE_HEADER == 'X-Sendfile'
+        else escape_uri_path(settings.SENDFILE_URL_PREFIX + request.path))
+    return response
+
+
+def serve_file(request, path, document_root):
+    """Отдает файл document_root без DEBUG.
+
+    С SENDFILE_HEADER отдачу берет на себя фронтовый прокси.
+    Иначе файл уходит в FileResponse открытым: сервер с
+    wsgi.file_wrapper передает его через os.sendfile. Поддерживаются
+    один диапазон Range и условные запросы по сильному ETag
+    из размера и времени изменения файла.
+    """
+    full_path, file_stat = find_file(path, document_root)
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+    if settings.SENDFILE_HEADER:
+        return sendfile_response(request, full_path, content_type)
+
+    size = file_stat.st_size
+    etag = f'"{size:x}-{file_stat.st_mtime_ns:x}"'
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(file_stat.st_mtime))
+    if response is None:
+        try:
+            byte_range = requested_range(request, etag, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+        file = open(full_path, 'rb')
+        if byte_range is None:
+            response = FileResponse(file, content_type=content_type)
+            response['Content-Length'] = size
+        else:
+            first, last = byte_range
+            file.seek(first)
+            response = FileResponse(
+                FileRange(file, last - first + 1), status=206,
+                content_type=content_type)
+            response['Content-Length'] = last - first + 1
+            response['Content-Range'] = f'bytes {first}-{last}/{size}'
+        if encoding:
+            response['Content-Encoding'] = encoding
+        response['Accept-Ranges'] = 'bytes'
+        response['Last-Modified'] = http_date(file_stat.st_mtime)
+    response['ETag'] = etag
+    return response
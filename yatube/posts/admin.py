@@ -1,24 +1,147 @@
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
 from django.contrib import admin
+from django.db.models import F, Max, Min, QuerySet
+from django.utils import timezone
 
 from .models import Comment, Follow, Group, Post
+from .search import match_query, matching_ids, search_supported
+from .utils import CachedCountPaginator, cached_counter, count_cache_key
+
+
+def period_start(value: datetime, kind: str) -> date:
+    """Начало года, месяца или дня, в который попадает value."""
+    if settings.USE_TZ:
+        value = timezone.localtime(value)
+    day = value.date()
+    if kind == 'year':
+        return day.replace(month=1, day=1)
+    if kind == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def next_period(start: date, kind: str) -> datetime:
+    """Начало следующего периода как значение для фильтра по полю."""
+    if kind == 'year':
+        start = start.replace(year=start.year + 1)
+    elif kind == 'month':
+        start = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    else:
+        start += timedelta(days=1)
+    value = datetime.combine(start, time.min)
+    if settings.USE_TZ:
+        return timezone.make_aware(value)
+    return value
+
+
+class IndexedDatesQuerySet(QuerySet):
+    """QuerySet, который ищет даты для навигации прыжками по индексу.
+
+    Обычный dates() выбирает DISTINCT по усеченной дате из всех строк
+    и сортирует их в памяти. Здесь на каждую найденную дату приходится
+    один поиск первой строки следующего периода по индексу поля.
+    """
+
+    def aggregate(self, *args, **kwargs):
+        """Min и Max полей берутся из индекса по отдельности.
+
+        SQLite читает крайнее значение из индекса, только если функция
+        в запросе одна; Min и Max вместе обходят весь индекс.
+        """
+        directions = {Min: '', Max: '-'}
+        if args or not all(
+                type(aggregate) in directions and aggregate.filter is None
+                and isinstance(aggregate.source_expressions[0], F)
+                for aggregate in kwargs.values()):
+            return super().aggregate(*args, **kwargs)
+        result = {}
+        for alias, aggregate in kwargs.items():
+            field_name = aggregate.source_expressions[0].name
+            result[alias] = self.filter(**{
+                f'{field_name}__isnull': False,
+            }).order_by(
+                directions[type(aggregate)] + field_name,
+            ).values_list(field_name, flat=True).first()
+        return result
 
+    def dates(self, field_name, kind, order='ASC'):
+        if kind not in ('year', 'month', 'day'):
+            return super().dates(field_name, kind, order)
+        values = self.order_by(field_name).values_list(field_name, flat=True)
+        dates = []
+        value = values.filter(**{f'{field_name}__isnull': False}).first()
+        while value is not None:
+            dates.append(period_start(value, kind))
+            value = values.filter(**{
+                f'{field_name}__gte': next_period(dates[-1], kind)}).first()
+        if order == 'DESC':
+            dates.reverse()
+        return dates
 
-class PostAdmin(admin.ModelAdmin):
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Список для таблиц на миллионы строк.
+
+    Количество без фильтров берется из кеша по ключу count_feed,
+    полное количество рядом с отфильтрованным не считается,
+    навигация по датам идет по индексу date_hierarchy.
+    """
+    count_feed = None
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        return IndexedDatesQuerySet(
+            queryset.model, queryset.query, queryset.db)
+
+    def get_paginator(self, request, queryset, per_page, orphans=0,
+                      allow_empty_first_page=True):
+        if queryset.query.where:
+            return super().get_paginator(
+                request, queryset, per_page, orphans, allow_empty_first_page)
+        return CachedCountPaginator(
+            queryset, per_page,
+            cached_counter(queryset, count_cache_key(self.count_feed)),
+            orphans=orphans, allow_empty_first_page=allow_empty_first_page)
+
+
+class PostAdmin(LargeTableAdmin):
     list_display = ('pk', 'text', 'pub_date', 'author', 'group')
     list_filter = ('pub_date',)
+    list_select_related = ('author', 'group')
     search_fields = ('text',)
+    autocomplete_fields = ('author', 'group')
+    date_hierarchy = 'pub_date'
     empty_value_display = '-пусто-'
-    list_editable = ('group',)
+    count_feed = 'index'
+
+    def get_search_results(self, request, queryset, search_term):
+        """Ищет по полнотекстовому индексу вместо LIKE по всей таблице."""
+        if not search_supported() or not match_query(search_term):
+            return super().get_search_results(
+                request, queryset, search_term)
+        return queryset.filter(pk__in=matching_ids(search_term)), False
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(LargeTableAdmin):
     list_display = ('pk', 'text', 'pub_date', 'author')
-    list_filter = ('pub_date', 'author',)
+    list_filter = ('pub_date',)
+    list_select_related = ('author',)
     search_fields = ('text',)
+    autocomplete_fields = ('author',)
+    raw_id_fields = ('post',)
+    date_hierarchy = 'pub_date'
     empty_value_display = '-пусто-'
+    count_feed = 'comments'
+
+
+class GroupAdmin(admin.ModelAdmin):
+    search_fields = ('title', 'slug')
 
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Comment, CommentAdmin)
-admin.site.register(Group)
+admin.site.register(Group, GroupAdmin)
 admin.site.register(Follow)
@@ -0,0 +1,104 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Follow, Post, User, UserStats
+
+
+def change_user_stats(user_id: int, **deltas) -> None:
+    """Сдвигает счетчики пользователя на deltas.
+
+    Если строки счетчиков еще нет, она собирается заново по данным,
+    но только при росте: при каскадном удалении пользователя его
+    строка удаляется раньше подписок, и пересборка по уже удаленным
+    подпискам увела бы счетчик ниже нуля. Счетчики не опускаются
+    ниже нуля.
+    """
+    updated = UserStats.objects.filter(user_id=user_id).update(**{
+        field: Greatest(F(field) + delta, 0)
+        for field, delta in deltas.items()
+    })
+    if (not updated and min(deltas.values()) > 0
+            and User.objects.filter(pk=user_id).exists()):
+        rebuild_user_stats(User.objects.filter(pk=user_id))
+
+
+def change_comments_count(post_id: int, delta: int) -> None:
+    """Сдвигает счетчик комментариев поста, не опуская его ниже нуля."""
+    Post.objects.filter(pk=post_id).update(
+        comments_count=Greatest(F('comments_count') + delta, 0))
+
+
+def user_stats(user) -> UserStats:
+    """Счетчики пользователя, при необходимости собранные заново."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        rebuild_user_stats(User.objects.filter(pk=user.pk))
+        return UserStats.objects.get(user=user)
+
+
+def count_subquery(queryset, field: str):
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+            field).annotate(count=Count('pk')).values('count')), 0)
+
+
+def actual_user_stats(users):
+    """Пользователи с посчитанными по данным счетчиками."""
+    return users.annotate(
+        actual_posts=count_subquery(Post.objects, 'author'),
+        actual_followers=count_subquery(Follow.objects, 'author'),
+        actual_following=count_subquery(Follow.objects, 'user'),
+    ).values_list(
+        'pk', 'actual_posts', 'actual_followers', 'actual_following')
+
+
+def actual_comments_counts(posts):
+    return posts.annotate(
+        actual_comments=count_subquery(Comment.objects, 'post'),
+    ).values_list('pk', 'comments_count', 'actual_comments')
+
+
+def rebuild_user_stats(users, check: bool = False) -> int:
+    """Сверяет счетчики пользователей с данными.
+
+    Возвращает количество расхождений, без check исправляет их.
+    """
+    stored = {
+        stats.user_id: stats
+        for stats in UserStats.objects.filter(user__in=users)
+    }
+    wrong = []
+    for pk, posts, followers, following in actual_user_stats(users):
+        stats = stored.get(pk)
+        if stats is None:
+            stats = UserStats(user_id=pk)
+        elif (stats.posts_count, stats.followers_count,
+              stats.following_count) == (posts, followers, following):
+            continue
+        stats.posts_count = posts
+        stats.followers_count = followers
+        stats.following_count = following
+        wrong.append(stats)
+    if not check and wrong:
+        missing = [stats for stats in wrong if stats.user_id not in stored]
+        UserStats.objects.bulk_create(missing, ignore_conflicts=True)
+        UserStats.objects.bulk_update(
+            [stats for stats in wrong if stats.user_id in stored],
+            ['posts_count', 'followers_count', 'following_count'])
+    return len(wrong)
+
+
+def rebuild_comments_counts(posts, check: bool = False) -> int:
+    """Сверяет счетчики комментариев постов с данными.
+
+    Возвращает количество расхождений, без check исправляет их.
+    """
+    wrong = [
+        Post(pk=pk, comments_count=actual)
+        for pk, stored, actual in actual_comments_counts(posts)
+        if stored != actual
+    ]
+    if not check and wrong:
+        Post.objects.bulk_update(wrong, ['comments_count'])
+    return len(wrong)
@@ -0,0 +1,311 @@
+import heapq
+from collections import deque
+from functools import partial
+from itertools import groupby, islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils.functional import cached_property
+
+from .models import Follow, Post, Timeline, UserStats
+
+FEED_RELATED: tuple = ('author', 'group')
+# Поля, по которым листается разложенная лента: копии даты и id поста
+# в Timeline, чтобы запрос шел по ее индексу.
+TIMELINE_ORDERING: tuple = ('feed_date', 'feed_pk')
+# Сколько авторов дочитывается одним запросом UNION ALL: SQLite
+# ограничивает число частей составного запроса и параметров.
+MERGE_AUTHORS_PER_QUERY: int = 200
+
+
+def hydrate_posts(post_list, *related):
+    """Посты ленты вместе с автором, группой и нужными счетчиками.
+
+    Все связанные объекты приходят в том же запросе, поэтому число
+    запросов на страницу не зависит от количества постов на ней.
+    """
+    return post_list.select_related(*FEED_RELATED, *related)
+
+
+def is_pulled(author_id: int) -> bool:
+    """Посты авторов с большим числом подписчиков не раскладываются
+    по лентам, а подтягиваются при чтении (см. UserStats.pulled)."""
+    return UserStats.objects.filter(user_id=author_id, pulled=True).exists()
+
+
+def pull_popular_authors(author_ids=None) -> int:
+    """Перестает раскладывать посты авторов (всех или из author_ids),
+    у которых подписчиков стало больше POSTS_FANOUT_FOLLOWER_LIMIT."""
+    stats = UserStats.objects.filter(
+        pulled=False,
+        followers_count__gt=settings.POSTS_FANOUT_FOLLOWER_LIMIT)
+    if author_ids is not None:
+        stats = stats.filter(user_id__in=author_ids)
+    return stats.update(pulled=True)
+
+
+def pulled_authors(user):
+    """Авторы из подписок читателя, чьи посты читаются напрямую."""
+    return Follow.objects.filter(
+        user=user, author__stats__pulled=True).values_list(
+        'author_id', flat=True)
+
+
+def bulk_insert_timeline(entries) -> None:
+    """Пишет строки ленты пачками, не собирая их все в памяти."""
+    entries = iter(entries)
+    batch_size = settings.POSTS_TIMELINE_BATCH_SIZE
+    batch = list(islice(entries, batch_size))
+    while batch:
+        Timeline.objects.bulk_create(batch, ignore_conflicts=True)
+        batch = list(islice(entries, batch_size))
+
+
+def fan_out_post(post: Post) -> None:
+    """Раскладывает новый пост в ленты подписчиков автора."""
+    if is_pulled(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True)
+    bulk_insert_timeline(
+        Timeline(user_id=user_id, post=post, pub_date=post.pub_date)
+        for user_id in followers.iterator())
+
+
+def backfill_timeline(user_id: int, author_id: int) -> None:
+    """Добавляет в ленту читателя посты автора, на которого он подписался."""
+    posts = Post.objects.filter(
+        author_id=author_id).values_list('pk', 'pub_date')
+    bulk_insert_timeline(
+        Timeline(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for post_id, pub_date in posts.iterator())
+
+
+def prune_timeline(user_id: int, author_id: int) -> None:
+    """Убирает из ленты читателя посты автора, от которого он отписался."""
+    Timeline.objects.filter(
+        user_id=user_id, post__author_id=author_id).delete()
+
+
+def follow_author(user_id: int, author_id: int) -> None:
+    """Обновляет ленту после новой подписки.
+
+    Счетчик подписчиков автора к этому времени уже увеличен. Флаг
+    и счетчик читаются одним запросом, а обновление нужно, только
+    если автор только что перешел порог.
+    """
+    pulled, followers = UserStats.objects.filter(
+        user_id=author_id).values_list(
+        'pulled', 'followers_count').first() or (False, 0)
+    if not pulled and followers > settings.POSTS_FANOUT_FOLLOWER_LIMIT:
+        pull_popular_authors([author_id])
+        pulled = True
+    if not pulled:
+        backfill_timeline(user_id, author_id)
+
+
+def unfollow_author(user_id: int, author_id: int) -> None:
+    """Обновляет ленту после отписки.
+
+    Посты автора, опустившегося до порога, по-прежнему подтягиваются
+    при чтении: ленты всех его подписчиков дополняет не запрос
+    отписки, а команда push_authors (см. push_popular_authors).
+    """
+    prune_timeline(user_id, author_id)
+
+
+def push_popular_authors() -> int:
+    """Снова раскладывает посты авторов, у которых подписчиков стало
+    не больше порога, и дополняет ими ленты подписчиков.
+
+    Возвращает количество таких авторов. Флаг снимается в одной
+    транзакции с дополнением лент и раньше него, поэтому новый пост
+    автора не потеряется между ними.
+    """
+    authors = list(UserStats.objects.filter(
+        pulled=True,
+        followers_count__lte=settings.POSTS_FANOUT_FOLLOWER_LIMIT,
+    ).values_list('user_id', flat=True))
+    for author_id in authors:
+        with transaction.atomic():
+            UserStats.objects.filter(user_id=author_id).update(pulled=False)
+            followers = Follow.objects.filter(
+                author_id=author_id).values_list('user_id', flat=True)
+            for follower_id in followers.iterator():
+                backfill_timeline(follower_id, author_id)
+    return len(authors)
+
+
+def timeline_posts(user):
+    """Посты ленты подписок читателя вместе со связанными объектами.
+
+    Разложенные посты читаются одним проходом по индексу
+    (user, pub_date, post) таблицы Timeline. Если среди подписок
+    есть авторы, чьи посты подтягиваются при чтении, лента сливается
+    из потока Timeline и потоков этих авторов (см. MergedFeed),
+    и каждый поток читается по своему индексу.
+    """
+    pulled = list(pulled_authors(user))
+    if pulled:
+        return MergedFeed(user, author_ids=pulled, timeline=True)
+    return hydrate_posts(Post.objects.filter(timeline__user=user).annotate(
+        feed_date=F('timeline__pub_date'),
+        feed_pk=F('timeline__post')).order_by(
+            *(f'-{field}' for field in TIMELINE_ORDERING)))
+
+
+def follow_count(user) -> int:
+    """Количество постов в ленте подписок по счетчикам авторов."""
+    return UserStats.objects.filter(
+        user__following__user=user).aggregate(
+            posts=Coalesce(Sum('posts_count'), 0))['posts']
+
+
+def follow_counter(user):
+    """Источник количества постов ленты подписок для post_obj."""
+    return partial(follow_count, user)
+
+
+def author_posts_after(author_id: int, cursor, batch_size: int):
+    """Ключи (pub_date, id) следующих batch_size постов автора после
+    ключа cursor или, если его нет, самых новых."""
+    posts = Post.objects.filter(author_id=author_id)
+    if cursor is not None:
+        pub_date, pk = cursor
+        posts = posts.filter(
+            Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk))
+    return posts.order_by('-pub_date', '-pk').values(
+        'pk', 'author_id', 'pub_date')[:batch_size]
+
+
+def next_author_keys(cursors: dict, batch_size: int) -> dict:
+    """Следующие пачки ключей постов для нескольких авторов сразу.
+
+    cursors - курсоры авторов, как в author_posts_after. Части
+    UNION ALL читаются по индексу (author, pub_date) каждая со своим
+    LIMIT, на запрос приходится до MERGE_AUTHORS_PER_QUERY авторов.
+    """
+    keys = {author_id: [] for author_id in cursors}
+    authors = iter(cursors.items())
+    chunk = list(islice(authors, MERGE_AUTHORS_PER_QUERY))
+    while chunk:
+        parts, params = [], []
+        for author_id, cursor in chunk:
+            sql, part_params = author_posts_after(
+                author_id, cursor, batch_size).query.sql_with_params()
+            parts.append(f'SELECT * FROM ({sql})')
+            params.extend(part_params)
+        for post in Post.objects.raw(' UNION ALL '.join(parts), params):
+            keys[post.author_id].append((post.pub_date, post.pk))
+        chunk = list(islice(authors, MERGE_AUTHORS_PER_QUERY))
+    for author_keys in keys.values():
+        author_keys.sort(reverse=True)
+    return keys
+
+
+class AuthorStreams:
+    """Потоки ключей (pub_date, id) постов авторов от новых к старым.
+
+    Пачки читаются для всех авторов сразу: когда поток одного автора
+    опустел, одним запросом дочитываются все потоки, в которых
+    осталось меньше пачки. Число запросов зависит от глубины
+    страницы, а не от числа авторов.
+    """
+
+    def __init__(self, author_ids, batch_size: int):
+        self.batch_size = batch_size
+        self.buffers = {author_id: deque() for author_id in author_ids}
+        self.cursors = dict.fromkeys(author_ids)
+        self.live = set(author_ids)
+
+    def refill(self) -> None:
+        cursors = {
+            author_id: self.cursors[author_id] for author_id in self.live
+            if len(self.buffers[author_id]) < self.batch_size
+        }
+        for author_id, keys in next_author_keys(
+                cursors, self.batch_size).items():
+            self.buffers[author_id].extend(keys)
+            if len(keys) < self.batch_size:
+                self.live.discard(author_id)
+            else:
+                self.cursors[author_id] = keys[-1]
+
+    def stream(self, author_id: int):
+        buffer = self.buffers[author_id]
+        while buffer or author_id in self.live:
+            if not buffer:
+                self.refill()
+                continue
+            yield buffer.popleft()
+
+    def merged(self):
+        """Ключи всех авторов, слитые кучей от новых к старым."""
+        if self.live:
+            self.refill()
+        return heapq.merge(
+            *(self.stream(author_id) for author_id in self.buffers),
+            reverse=True)
+
+
+def timeline_stream(user_id: int, batch_size: int):
+    """Ключи (pub_date, id) постов из разложенной ленты читателя
+    от новых к старым, пачками по индексу (user, pub_date, post)."""
+    rows = Timeline.objects.filter(user_id=user_id).order_by(
+        '-pub_date', '-post').values_list('pub_date', 'post_id')
+    batch = list(rows[:batch_size])
+    while batch:
+        yield from batch
+        if len(batch) < batch_size:
+            return
+        pub_date, pk = batch[-1]
+        batch = list(rows.filter(
+            Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, post_id__lt=pk)
+        )[:batch_size])
+
+
+class MergedFeed:
+    """Лента подписок, собранная k-way слиянием потоков авторов.
+
+    Вместо соединения Follow и Post читает по небольшой пачке свежих
+    постов каждого автора (см. AuthorStreams) и сливает их кучей,
+    останавливаясь, как только набрана запрошенная страница.
+    С author_ids сливаются только эти авторы, с timeline к ним
+    добавляется разложенная лента читателя; пост, который есть
+    в обоих потоках, выводится один раз. Подходит для post_obj
+    вместе с follow_counter.
+    """
+
+    def __init__(self, user, author_ids=None, timeline: bool = False):
+        self.user = user
+        self.timeline = timeline
+        if author_ids is not None:
+            self.author_ids = author_ids
+
+    @cached_property
+    def author_ids(self) -> list:
+        return list(Follow.objects.filter(
+            user=self.user).values_list('author_id', flat=True))
+
+    def count(self) -> int:
+        return follow_count(self.user)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop = index.start or 0, index.stop
+        batch_size = min(stop, settings.POSTS_MERGE_BATCH_SIZE)
+        keys = AuthorStreams(self.author_ids, batch_size).merged()
+        if self.timeline:
+            keys = heapq.merge(
+                keys, timeline_stream(self.user.pk, batch_size),
+                reverse=True)
+        unique = (key for key, _ in groupby(keys))
+        ids = [pk for _, pk in islice(unique, start, stop)]
+        posts = hydrate_posts(Post.objects).in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
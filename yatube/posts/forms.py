@@ -1,6 +1,8 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
 from .models import Comment, Post
+from .uploads import check_image
 
 
 class PostForm(forms.ModelForm):
@@ -8,6 +10,25 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ('text', 'group', 'image',)
 
+    def __init__(self, *args, **kwargs):
+        """Файл, отклоненный при загрузке, не доходит до поля image:
+        его ошибка выводится в clean_image."""
+        super().__init__(*args, **kwargs)
+        self.upload_error = None
+        image = self.files.get(self.add_prefix('image'))
+        if getattr(image, 'upload_error', None) is not None:
+            self.files = self.files.copy()
+            self.files.pop(self.add_prefix('image'))
+            self.upload_error = image.upload_error
+
+    def clean_image(self):
+        if self.upload_error is not None:
+            raise self.upload_error
+        image = self.cleaned_data['image']
+        if isinstance(image, UploadedFile):
+            check_image(image)
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,138 @@
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, features
+
+# Варианты картинки, которые выводят шаблоны: имя -> размер кадра,
+# ширины, из которых браузер выбирает по srcset, и ширина на странице.
+IMAGE_PRESETS: dict = {
+    'card': {
+        'size': (960, 339),
+        'widths': (320, 640, 960),
+        'sizes': '(min-width: 1200px) 960px, 100vw',
+    },
+}
+# Форматы вариантов от предпочтительного: расширение, формат Pillow,
+# тип для <source>. Последний выводится в <img> для старых браузеров.
+# WebP пишется, только если Pillow собран с libwebp.
+IMAGE_FORMATS: tuple = (
+    ('webp', 'WEBP', 'image/webp'),
+    ('jpg', 'JPEG', 'image/jpeg'),
+)
+IMAGE_QUALITY: int = 80
+VARIANTS_DIR: str = 'variants'
+EXIF_ORIENTATION: int = 0x0112
+# Значения Orientation, при которых картинка повернута на 90 градусов.
+TRANSPOSED_ORIENTATIONS: tuple = (5, 6, 7, 8)
+
+
+def image_formats() -> list:
+    return [
+        image_format for image_format in IMAGE_FORMATS
+        if image_format[1] != 'WEBP' or features.check('webp')
+    ]
+
+
+def oriented_size(file) -> tuple:
+    """Ширина и высота картинки с учетом поворота из EXIF.
+
+    Pillow читает только заголовок, картинка не декодируется.
+    Для файла, который не читается как картинка, - (None, None).
+    """
+    position = file.tell()
+    file.seek(0)
+    try:
+        with Image.open(file) as image:
+            width, height = image.size
+            orientation = image.getexif().get(EXIF_ORIENTATION)
+    except OSError:
+        return None, None
+    finally:
+        file.seek(position)
+    if orientation in TRANSPOSED_ORIENTATIONS:
+        return height, width
+    return width, height
+
+
+def variant_name(name: str, preset: str, width: int, extension: str) -> str:
+    stem = os.path.splitext(name)[0]
+    return f'{VARIANTS_DIR}/{stem}/{preset}-{width}.{extension}'
+
+
+def delete_variants(name: str) -> None:
+    """Удаляет все варианты картинки name."""
+    directory = os.path.dirname(variant_name(name, '', 0, ''))
+    try:
+        files = default_storage.listdir(directory)[1]
+    except FileNotFoundError:
+        return
+    for file_name in files:
+        default_storage.delete(f'{directory}/{file_name}')
+
+
+def save_variant(image: Image.Image, name: str, pillow_format: str) -> str:
+    """Сохраняет вариант без метаданных, заменяя прежний файл."""
+    content = BytesIO()
+    image.save(content, pillow_format, quality=IMAGE_QUALITY,
+               optimize=True, progressive=pillow_format == 'JPEG')
+    default_storage.delete(name)
+    return default_storage.save(name, ContentFile(content.getvalue()))
+
+
+def render_variants(image: Image.Image, name: str, preset: str) -> dict:
+    """Варианты preset картинки name: кадр по центру в нескольких
+    ширинах и форматах.
+
+    Ширины больше кадра исходной картинки пропускаются, кроме
+    наименьшей. Возвращает адрес, размеры и srcset для <img>
+    в последнем, самом совместимом формате и <source> остальных.
+    """
+    frame_width, frame_height = IMAGE_PRESETS[preset]['size']
+    widths = IMAGE_PRESETS[preset]['widths']
+    source_width = min(image.width, image.height * frame_width
+                       // frame_height)
+    widths = [width for width in widths if width <= source_width] or [
+        widths[0]]
+    srcset = {}
+    for width in widths:
+        height = round(width * frame_height / frame_width)
+        frame = ImageOps.fit(image, (width, height), Image.LANCZOS)
+        for extension, pillow_format, mime_type in image_formats():
+            url = default_storage.url(save_variant(
+                frame, variant_name(name, preset, width, extension),
+                pillow_format))
+            srcset.setdefault(mime_type, []).append(f'{url} {width}w')
+    sources = [
+        {'type': mime_type, 'srcset': ', '.join(candidates)}
+        for mime_type, candidates in srcset.items()
+    ]
+    return {
+        'url': url,
+        'width': width,
+        'height': height,
+        'srcset': sources.pop()['srcset'],
+        'sizes': IMAGE_PRESETS[preset]['sizes'],
+        'sources': sources,
+    }
+
+
+def process_image(name: str) -> tuple:
+    """Размеры картинки name с учетом поворота и все ее варианты.
+
+    Поворот из EXIF применяется к пикселям, сами метаданные
+    в варианты не попадают.
+    """
+    with default_storage.open(name) as file, Image.open(file) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode != 'RGB':
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, 'white')
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        variants = {
+            preset: render_variants(image, name, preset)
+            for preset in IMAGE_PRESETS
+        }
+        return image.size, variants
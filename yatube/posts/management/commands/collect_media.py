@@ -0,0 +1,56 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.template.defaultfilters import filesizeformat
+
+from posts.media import (batches, media_dirs, orphaned_files,
+                         prune_directories, remove_files)
+
+
+class Command(BaseCommand):
+    help = ('Находит в MEDIA_ROOT картинки, их варианты и миниатюры sorl, '
+            'на которые не ссылается ни один пост.')
+
+    def add_arguments(self, parser):
+        action = parser.add_mutually_exclusive_group()
+        action.add_argument(
+            '--delete', action='store_true',
+            help='Удалить найденные файлы.')
+        action.add_argument(
+            '--quarantine', metavar='DIR',
+            help='Перенести найденные файлы в каталог DIR.')
+        parser.add_argument(
+            '--min-age', type=int, default=60 * 60,
+            help='Не трогать файлы моложе стольких секунд.')
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько имен сверять с базой одним запросом.')
+
+    def handle(self, *args, delete=False, quarantine=None, min_age=3600,
+               batch_size=500, **options):
+        roots = [os.path.realpath(os.path.join(settings.MEDIA_ROOT, name))
+                 for name in media_dirs()]
+        if quarantine is not None:
+            quarantine = os.path.realpath(quarantine)
+            if any(os.path.commonpath([root, quarantine]) == root
+                   for root in roots):
+                raise CommandError(
+                    'Каталог карантина не может лежать в проверяемых.')
+        count = size = 0
+        for batch in batches(orphaned_files(batch_size, min_age), batch_size):
+            count += len(batch)
+            size += sum(file_size for name, file_size in batch)
+            if options['verbosity'] > 1:
+                for name, file_size in batch:
+                    self.stdout.write(name)
+            if delete or quarantine is not None:
+                remove_files([name for name, file_size in batch], quarantine)
+        if delete or quarantine is not None:
+            for root in roots:
+                if os.path.isdir(root):
+                    prune_directories(root)
+        action = ('Удалено' if delete else 'Перенесено' if quarantine
+                  else 'Найдено')
+        self.stdout.write(
+            f'{action} файлов без ссылок: {count} ({filesizeformat(size)}).')
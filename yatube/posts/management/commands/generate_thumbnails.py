@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Min, Q
+
+from posts.models import Post
+from posts.thumbnails import generate_thumbnails
+
+
+class Command(BaseCommand):
+    help = ('Заполняет размеры и миниатюры картинок постов, '
+            'у которых их еще нет.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Создать заново миниатюры всех картинок.')
+
+    def handle(self, *args, all=False, **options):
+        images = Post.objects.exclude(image='')
+        if all:
+            # Одинаковые картинки делят файл и обрабатываются один раз.
+            images = images.values('image').annotate(pk=Min('pk'))
+        else:
+            images = images.filter(
+                Q(image_thumbnails='') | Q(image_width__isnull=True))
+        count = 0
+        for pk, name in images.order_by('pk').values_list(
+                'pk', 'image').iterator():
+            generate_thumbnails(name, pk, force=all)
+            count += 1
+        self.stdout.write(f'Обработано картинок: {count}.')
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from posts.feeds import push_popular_authors
+
+
+class Command(BaseCommand):
+    help = ('Снова раскладывает по лентам посты авторов, у которых '
+            'подписчиков стало не больше POSTS_FANOUT_FOLLOWER_LIMIT.')
+
+    def handle(self, *args, **options):
+        count = push_popular_authors()
+        self.stdout.write(f'Авторов снова в лентах: {count}.')
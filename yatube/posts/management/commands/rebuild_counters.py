@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from posts.counters import rebuild_comments_counts, rebuild_user_stats
+from posts.models import Post, User
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает счетчики постов, подписчиков, подписок '
+            'и комментариев по данным.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Только сверить счетчики, ошибка при расхождениях.')
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Сколько строк сверять в одной транзакции.')
+
+    def handle(self, *args, check=False, chunk_size=1000, **options):
+        wrong_users = self.rebuild(
+            User.objects, rebuild_user_stats, check, chunk_size)
+        wrong_posts = self.rebuild(
+            Post.objects, rebuild_comments_counts, check, chunk_size)
+        action = 'Найдено' if check else 'Исправлено'
+        self.stdout.write(
+            f'{action} расхождений: пользователей {wrong_users}, '
+            f'постов {wrong_posts}.')
+        if check and (wrong_users or wrong_posts):
+            raise CommandError('Счетчики расходятся с данными.')
+
+    def rebuild(self, manager, rebuild, check: bool, chunk_size: int) -> int:
+        """Проходит таблицу диапазонами pk, каждый в своей транзакции."""
+        wrong = 0
+        last_pk = 0
+        while True:
+            pks = list(manager.filter(pk__gt=last_pk).order_by(
+                'pk').values_list('pk', flat=True)[:chunk_size])
+            if not pks:
+                return wrong
+            with transaction.atomic():
+                wrong += rebuild(
+                    manager.filter(pk__gte=pks[0], pk__lte=pks[-1]), check)
+            last_pk = pks[-1]
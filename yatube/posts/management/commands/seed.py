@@ -0,0 +1,235 @@
+import random
+import time
+from bisect import bisect
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import accumulate, islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from faker import Faker
+from mixer.backend.django import Mixer
+
+from posts.feeds import pull_popular_authors
+from posts.models import (Comment, Follow, Group, Post, Timeline, User,
+                          UserStats)
+
+TEXTS_POOL_SIZE: int = 1000
+GROUP_SHARE: float = 0.7
+
+
+@contextmanager
+def explicit_pub_date(*models):
+    """Разрешает bulk_create сохранить заданные pub_date.
+
+    Иначе auto_now_add заменит их текущим временем.
+    """
+    fields = [model._meta.get_field('pub_date') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def last_pk(model) -> int:
+    return model.objects.aggregate(last=Max('pk'))['last'] or 0
+
+
+def new_pks(model, after: int) -> list:
+    """pk строк, вставленных после after: bulk_create их не возвращает."""
+    return list(model.objects.filter(pk__gt=after).order_by(
+        'pk').values_list('pk', flat=True))
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу случайными пользователями, группами, постами, '
+            'комментариями и подписками для нагрузочных тестов.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument(
+            '--follows', type=int, default=10000,
+            help='Сколько подписок создать, авторы выбираются по '
+                 'степенному закону: немногие собирают большинство.')
+        parser.add_argument(
+            '--alpha', type=float, default=1.1,
+            help='Показатель степенного закона для подписок.')
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней распределить даты постов.')
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Сколько строк вставлять в одной транзакции.')
+        parser.add_argument(
+            '--password', default='yatube-seed',
+            help='Пароль всех созданных пользователей.')
+        parser.add_argument('--random-seed', type=int, default=None)
+        parser.add_argument(
+            '--skip-timelines', action='store_true',
+            help='Не раскладывать посты по лентам подписчиков.')
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.random = random.Random(options['random_seed'])
+        if options['random_seed'] is not None:
+            Faker.seed(options['random_seed'])
+        self.faker = Faker('ru_RU')
+        self.mixer = Mixer(commit=False)
+        self.now = timezone.now()
+        self.start = self.now - timedelta(days=options['days'])
+
+        users = self.step('Пользователи', self.seed_users,
+                          options['users'], options['password'])
+        groups = self.step('Группы', self.seed_groups, options['groups'])
+        posts = self.step('Посты', self.seed_posts,
+                          options['posts'], users, groups)
+        self.step('Комментарии', self.seed_comments,
+                  options['comments'], users, posts)
+        follow_after = last_pk(Follow)
+        self.step('Подписки', self.seed_follows,
+                  options['follows'], users, options['alpha'])
+        self.step('Счетчики', call_command,
+                  'rebuild_counters', stdout=self.stdout)
+        self.step('Популярные авторы', pull_popular_authors)
+        if not options['skip_timelines']:
+            self.step('Ленты подписок', self.seed_timelines, follow_after)
+        cache.clear()
+
+    def step(self, title: str, func, *args, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        count = f': {len(result)}' if isinstance(result, list) else ''
+        self.stdout.write(
+            f'{title}{count} за {time.perf_counter() - start:.1f} с.')
+        return result
+
+    def insert(self, model, objs, **kwargs) -> None:
+        """Вставляет объекты пачками, каждую в своей транзакции."""
+        objs = iter(objs)
+        while True:
+            batch = list(islice(objs, self.batch_size))
+            if not batch:
+                return
+            with transaction.atomic():
+                model.objects.bulk_create(batch, **kwargs)
+
+    def seed_users(self, count: int, password: str) -> list:
+        after = last_pk(User)
+        password = make_password(password)
+        users = self.mixer.cycle(count).blend(User, password=password)
+        for i, user in enumerate(users):
+            user.username = f'{user.username[:120]}{after + i}'
+        self.insert(User, users)
+        return new_pks(User, after)
+
+    def seed_groups(self, count: int) -> list:
+        after = last_pk(Group)
+        groups = self.mixer.cycle(count).blend(Group)
+        for i, group in enumerate(groups):
+            group.slug = f'{group.slug[:40]}-{after + i}'
+        self.insert(Group, groups)
+        return new_pks(Group, after)
+
+    def post_date(self, index: int, count: int, offset=None):
+        """Даты постов растут вместе с pk, как при обычной публикации.
+
+        Пост с номером index попадает в свой интервал из count равных,
+        offset задает место внутри интервала, по умолчанию случайное.
+        """
+        if offset is None:
+            offset = self.random.random()
+        return self.start + (self.now - self.start) * (index + offset) / count
+
+    def seed_posts(self, count: int, users: list, groups: list) -> list:
+        after = last_pk(Post)
+        texts = [self.faker.paragraph(nb_sentences=5)
+                 for _ in range(TEXTS_POOL_SIZE)]
+        posts = (
+            Post(author_id=self.random.choice(users),
+                 group_id=(self.random.choice(groups)
+                           if groups and self.random.random() < GROUP_SHARE
+                           else None),
+                 text=self.random.choice(texts),
+                 pub_date=self.post_date(i, count))
+            for i in range(count)
+        )
+        with explicit_pub_date(Post):
+            self.insert(Post, posts)
+        return new_pks(Post, after)
+
+    def seed_comments(self, count: int, users: list, posts: list) -> None:
+        if not posts:
+            return
+        texts = [self.faker.sentence() for _ in range(TEXTS_POOL_SIZE)]
+
+        def comment():
+            index = self.random.randrange(len(posts))
+            after = self.post_date(index, len(posts), offset=1)
+            return Comment(
+                post_id=posts[index],
+                author_id=self.random.choice(users),
+                text=self.random.choice(texts),
+                pub_date=after + (self.now - after) * self.random.random())
+
+        with explicit_pub_date(Comment):
+            self.insert(Comment, (comment() for _ in range(count)))
+
+    def seed_follows(self, count: int, users: list, alpha: float) -> list:
+        """Подписки, у автора ранга r вес 1 / r ** alpha."""
+        if len(users) < 2:
+            return []
+        authors = users[:]
+        self.random.shuffle(authors)
+        weights = list(accumulate(
+            1 / rank ** alpha for rank in range(1, len(authors) + 1)))
+        count = min(count, len(users) * (len(users) - 1))
+        edges = set()
+        attempts = count * 10
+        while len(edges) < count and attempts:
+            attempts -= 1
+            author = authors[bisect(
+                weights, self.random.random() * weights[-1])]
+            user = self.random.choice(users)
+            if user != author:
+                edges.add((user, author))
+        self.insert(
+            Follow,
+            (Follow(user_id=user, author_id=author)
+             for user, author in edges),
+            ignore_conflicts=True)
+        return list(edges)
+
+    def seed_timelines(self, after: int) -> None:
+        """Раскладывает посты по лентам новых подписчиков.
+
+        Посты авторов, которые читаются напрямую, не раскладываются.
+        Ленты занимают больше всего строк, поэтому каждая пачка подписок
+        раскладывается одним INSERT ... SELECT без объектов моделей.
+        """
+        qn = connection.ops.quote_name
+        timeline, follow, post, stats = (
+            model._meta.db_table for model in (Timeline, Follow, Post,
+                                               UserStats))
+        sql = (
+            f'INSERT INTO {qn(timeline)} ("user_id", "post_id", "pub_date") '
+            f'SELECT f."user_id", p."id", p."pub_date" FROM {qn(follow)} f '
+            f'INNER JOIN {qn(stats)} s ON s."user_id" = f."author_id" '
+            f'INNER JOIN {qn(post)} p ON p."author_id" = f."author_id" '
+            f'WHERE f."id" > %s AND f."id" <= %s '
+            f'AND NOT s."pulled"')
+        pks = new_pks(Follow, after)
+        for start in range(0, len(pks), self.batch_size):
+            chunk = pks[start:start + self.batch_size]
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(sql, [chunk[0] - 1, chunk[-1]])
@@ -0,0 +1,202 @@
+import os
+import shutil
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from sorl.thumbnail import default as sorl
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+
+from .images import VARIANTS_DIR, delete_variants
+from .models import MediaFile, Post
+from .storage import image_storage, is_content_addressed
+
+# Сколько исходных картинок проверяется одним запросом по вариантам:
+# каждая добавляет в WHERE три условия, а глубина выражения в SQLite
+# ограничена.
+VARIANT_STEMS_PER_QUERY = 100
+
+
+def acquire_image(name: str) -> None:
+    """Добавляет ссылку на файл name.
+
+    Если строки счетчика еще нет, ссылки считаются по постам.
+    """
+    if not name:
+        return
+    updated = MediaFile.objects.filter(name=name).update(
+        references=F('references') + 1)
+    if not updated:
+        MediaFile.objects.update_or_create(name=name, defaults={
+            'references': Post.objects.filter(image=name).count()})
+
+
+def release_image(name: str) -> None:
+    """Убирает ссылку на файл name, последняя ссылка удаляет файл
+    после коммита."""
+    if not name:
+        return
+    MediaFile.objects.filter(name=name, references__gt=0).update(
+        references=F('references') - 1)
+    transaction.on_commit(lambda: delete_unreferenced(name))
+
+
+def delete_unreferenced(name: str) -> bool:
+    """Удаляет файл name и его миниатюры, если на него не ссылается
+    ни один пост.
+
+    Удаляются только файлы этого хранилища: файлы с именами
+    из загрузки могли достаться нескольким постам. Файл, который
+    недавно загрузили снова, остается до следующей проверки.
+    """
+    if not is_content_addressed(name):
+        return False
+    if not MediaFile.objects.filter(name=name, references=0).exists():
+        return False
+    references = Post.objects.filter(image=name).count()
+    if references:
+        MediaFile.objects.filter(name=name).update(references=references)
+        return False
+    if image_storage.exists(name) and (
+            time.time() - os.path.getmtime(image_storage.path(name))
+            < settings.POSTS_IMAGE_DELETE_DELAY):
+        return False
+    MediaFile.objects.filter(name=name, references=0).delete()
+    image_storage.delete(name)
+    delete_variants(name)
+    return True
+
+
+def images_dir() -> str:
+    return Post._meta.get_field('image').upload_to.strip('/')
+
+
+def sorl_dir() -> str:
+    return sorl_settings.THUMBNAIL_PREFIX.strip('/')
+
+
+def media_dirs() -> tuple:
+    """Каталоги MEDIA_ROOT, которые чистит сборщик."""
+    return images_dir(), VARIANTS_DIR, sorl_dir()
+
+
+def batches(iterable, size: int):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def scan_files(path: str, name: str):
+    """Файлы каталога path и всех вложенных: имя от MEDIA_ROOT и DirEntry.
+
+    os.scandir отдает записи по мере чтения каталога, поэтому память
+    не зависит от числа файлов в нем.
+    """
+    with os.scandir(path) as entries:
+        for entry in entries:
+            entry_name = f'{name}/{entry.name}'
+            if entry.is_dir(follow_symlinks=False):
+                yield from scan_files(entry.path, entry_name)
+            elif entry.is_file(follow_symlinks=False):
+                yield entry_name, entry
+
+
+def referenced_images(names: list) -> set:
+    return set(Post.objects.filter(image__in=names).values_list(
+        'image', flat=True))
+
+
+def variant_stem(name: str) -> str:
+    """Имя картинки без расширения, к которой относится вариант name."""
+    return os.path.dirname(name)[len(VARIANTS_DIR) + 1:]
+
+
+def referenced_variants(names: list) -> set:
+    """Варианты картинок, на которые ссылаются посты.
+
+    Картинки ищутся по индексу диапазоном имен от "<стем>."
+    до "<стем>/": так находится картинка с любым расширением.
+    """
+    stems = {variant_stem(name) for name in names}
+    referenced = set()
+    for chunk in batches(stems, VARIANT_STEMS_PER_QUERY):
+        query = Q()
+        for stem in chunk:
+            query |= Q(image=stem) | Q(
+                image__gte=f'{stem}.', image__lt=f'{stem}/')
+        referenced.update(
+            os.path.splitext(image)[0] for image in Post.objects.filter(
+                query).values_list('image', flat=True))
+    return {name for name in names if variant_stem(name) in referenced}
+
+
+def referenced_nothing(names: list) -> set:
+    """Миниатюры sorl страницы больше не выводят, ссылок на них нет."""
+    return set()
+
+
+def orphaned_files(batch_size: int, min_age: int):
+    """Файлы каталогов media_dirs без ссылок из базы: имя и размер.
+
+    Каталоги читаются потоком и сверяются с базой пачками
+    по batch_size имен. Файлы моложе min_age секунд пропускаются:
+    картинка попадает в хранилище раньше, чем пост в базу.
+    """
+    newest = time.time() - min_age
+    for directory, referenced in zip(media_dirs(), (
+            referenced_images, referenced_variants, referenced_nothing)):
+        root = os.path.join(settings.MEDIA_ROOT, directory)
+        if not os.path.isdir(root):
+            continue
+        for batch in batches(scan_files(root, directory), batch_size):
+            files = {}
+            for name, entry in batch:
+                stat = entry.stat(follow_symlinks=False)
+                if stat.st_mtime < newest:
+                    files[name] = stat.st_size
+            kept = referenced(list(files))
+            for name, size in files.items():
+                if name not in kept:
+                    yield name, size
+
+
+def remove_files(names: list, quarantine: str = None) -> None:
+    """Удаляет файлы names или переносит их в каталог quarantine
+    с теми же относительными путями.
+
+    Вместе с картинками удаляются их счетчики ссылок, вместе
+    с миниатюрами sorl - их записи в хранилище sorl.
+    """
+    for name in names:
+        path = os.path.join(settings.MEDIA_ROOT, name)
+        try:
+            if quarantine is None:
+                os.remove(path)
+            else:
+                target = os.path.join(quarantine, name)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.move(path, target)
+        except FileNotFoundError:
+            pass
+        if name.startswith(f'{sorl_dir()}/'):
+            sorl.kvstore.delete(
+                ImageFile(name, sorl.storage), delete_thumbnails=False)
+    MediaFile.objects.filter(name__in=names, references=0).delete()
+
+
+def prune_directories(path: str) -> None:
+    """Удаляет пустые вложенные каталоги path снизу вверх."""
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                prune_directories(entry.path)
+                try:
+                    os.rmdir(entry.path)
+                except OSError:
+                    pass
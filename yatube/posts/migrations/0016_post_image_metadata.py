@@ -0,0 +1,51 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:07
+
+from django.db import migrations, models
+
+# SQLite пересоздает posts_post при добавлении полей и теряет
+# ее триггеры: они создаются заново после изменения, а при откате -
+# после обратной операции.
+CREATE_TRIGGERS = [
+    '''CREATE TRIGGER posts_post_fts_insert
+        AFTER INSERT ON posts_post BEGIN
+        INSERT INTO posts_post_fts(rowid, text) VALUES (new.id, new.text);
+        END''',
+    '''CREATE TRIGGER posts_post_fts_delete
+        AFTER DELETE ON posts_post BEGIN
+        INSERT INTO posts_post_fts(posts_post_fts, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        END''',
+    '''CREATE TRIGGER posts_post_fts_update
+        AFTER UPDATE OF text ON posts_post BEGIN
+        INSERT INTO posts_post_fts(posts_post_fts, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        INSERT INTO posts_post_fts(rowid, text) VALUES (new.id, new.text);
+        END''',
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_comment_pub_date_index'),
+    ]
+
+    operations = [
+        migrations.RunSQL(migrations.RunSQL.noop, CREATE_TRIGGERS),
+        migrations.AddField(
+            model_name='post',
+            name='image_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Высота картинки'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_thumbnails',
+            field=models.TextField(blank=True, default='', editable=False, help_text='JSON: имя миниатюры -> адрес, ширина и высота', verbose_name='Миниатюры картинки'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Ширина картинки'),
+        ),
+        migrations.RunSQL(CREATE_TRIGGERS, migrations.RunSQL.noop),
+    ]
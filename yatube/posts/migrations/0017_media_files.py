@@ -0,0 +1,66 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:18
+
+from django.db import migrations, models
+from django.db.models import Count
+
+import posts.storage
+
+
+def count_references(apps, schema_editor):
+    MediaFile = apps.get_model('posts', 'MediaFile')
+    Post = apps.get_model('posts', 'Post')
+    MediaFile.objects.bulk_create(
+        MediaFile(name=row['image'], references=row['references'])
+        for row in Post.objects.exclude(image='').values('image').annotate(
+            references=Count('pk')).order_by().iterator())
+
+
+# SQLite пересоздает posts_post при изменении поля и теряет
+# ее триггеры: они создаются заново после изменения, а при откате -
+# после обратной операции.
+CREATE_TRIGGERS = [
+    '''CREATE TRIGGER posts_post_fts_insert
+        AFTER INSERT ON posts_post BEGIN
+        INSERT INTO posts_post_fts(rowid, text) VALUES (new.id, new.text);
+        END''',
+    '''CREATE TRIGGER posts_post_fts_delete
+        AFTER DELETE ON posts_post BEGIN
+        INSERT INTO posts_post_fts(posts_post_fts, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        END''',
+    '''CREATE TRIGGER posts_post_fts_update
+        AFTER UPDATE OF text ON posts_post BEGIN
+        INSERT INTO posts_post_fts(posts_post_fts, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        INSERT INTO posts_post_fts(rowid, text) VALUES (new.id, new.text);
+        END''',
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_post_image_metadata'),
+    ]
+
+    operations = [
+        migrations.RunSQL(migrations.RunSQL.noop, CREATE_TRIGGERS),
+        migrations.CreateModel(
+            name='MediaFile',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False, verbose_name='Имя файла')),
+                ('references', models.PositiveIntegerField(default=0, verbose_name='Количество ссылок')),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, storage=posts.storage.ContentAddressedStorage(), upload_to='posts/', verbose_name='Картинка'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['image'], name='post_image_idx'),
+        ),
+        migrations.RunPython(count_references, migrations.RunPython.noop),
+        migrations.RunSQL(CREATE_TRIGGERS, migrations.RunSQL.noop),
+    ]
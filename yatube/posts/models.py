@@ -1,9 +1,13 @@
+import json
+
 from django.contrib.auth import get_user_model
 from django.db import models
 from django.urls import reverse
 
 from core.models import CreatedModel
 
+from .storage import image_storage
+
 User = get_user_model()
 
 
@@ -35,7 +39,56 @@ class Post(CreatedModel):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=image_storage,
         blank=True)
+    image_width = models.PositiveIntegerField(
+        'Ширина картинки',
+        null=True,
+        blank=True,
+        editable=False)
+    image_height = models.PositiveIntegerField(
+        'Высота картинки',
+        null=True,
+        blank=True,
+        editable=False)
+    image_thumbnails = models.TextField(
+        'Миниатюры картинки',
+        blank=True,
+        default='',
+        editable=False,
+        help_text='JSON: имя миниатюры -> адрес, ширина и высота')
+    comments_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False)
+
+    class Meta(CreatedModel.Meta):
+        indexes = [
+            models.Index(
+                fields=['pub_date'],
+                name='post_pub_date_idx'),
+            models.Index(
+                fields=['author', 'pub_date'],
+                name='post_author_pub_date_idx'),
+            models.Index(
+                fields=['group', 'pub_date'],
+                name='post_group_pub_date_idx'),
+            models.Index(
+                fields=['image'],
+                name='post_image_idx')]
+
+    def image_variant(self, name: str):
+        """Адрес и размеры миниатюры name или самой картинки,
+        пока миниатюры нет. Не читает ни файлы, ни хранилище миниатюр.
+        """
+        if not self.image:
+            return None
+        thumbnails = json.loads(self.image_thumbnails or '{}')
+        return thumbnails.get(name) or {
+            'url': self.image.url,
+            'width': self.image_width,
+            'height': self.image_height,
+        }
 
 
 class Comment(CreatedModel):
@@ -49,6 +102,15 @@ class Comment(CreatedModel):
         related_name='comments')
     text = models.TextField()
 
+    class Meta(CreatedModel.Meta):
+        indexes = [
+            models.Index(
+                fields=['pub_date'],
+                name='comment_pub_date_idx'),
+            models.Index(
+                fields=['post', 'pub_date'],
+                name='comment_post_pub_date_idx')]
+
     def get_absolute_url(self):
         return reverse('posts:post_detail',
                        kwargs={'post_id': self.post.id})
@@ -69,3 +131,57 @@ class Follow(models.Model):
             models.UniqueConstraint(
                 fields=['user', 'author'],
                 name='Unique_follow')]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'],
+                name='follow_author_user_idx')]
+
+
+class Timeline(models.Model):
+    """Лента подписок, разложенная по читателям при публикации."""
+    user = models.ForeignKey(
+        User,
+        related_name='timeline',
+        on_delete=models.CASCADE)
+    post = models.ForeignKey(
+        Post,
+        related_name='timeline',
+        on_delete=models.CASCADE)
+    pub_date = models.DateTimeField('Дата публикации поста')
+
+    class Meta:
+        ordering = ['-pub_date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='Unique_timeline')]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx')]
+
+
+class UserStats(models.Model):
+    """Счетчики пользователя, которые обновляются при записи."""
+    user = models.OneToOneField(
+        User,
+        primary_key=True,
+        related_name='stats',
+        on_delete=models.CASCADE)
+    posts_count = models.PositiveIntegerField(
+        'Количество постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'Количество подписчиков', default=0)
+    following_count = models.PositiveIntegerField(
+        'Количество подписок', default=0)
+    pulled = models.BooleanField(
+        'Посты подтягиваются при чтении лент', default=False)
+
+
+class MediaFile(models.Model):
+    """Файл картинки в хранилище и число постов, которые на него
+    ссылаются. Файл удаляется вместе с последней ссылкой."""
+    name = models.CharField(
+        'Имя файла', max_length=100, primary_key=True)
+    references = models.PositiveIntegerField(
+        'Количество ссылок', default=0)
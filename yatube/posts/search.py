@@ -0,0 +1,106 @@
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils.functional import cached_property
+
+from .feeds import hydrate_posts
+from .models import Post
+
+# Внешний индекс FTS5 и синхронизирующие его триггеры создаются
+# миграциями, начиная с 0014_post_search.
+SEARCH_TABLE: str = 'posts_post_fts'
+SEARCH_WORD = re.compile(r'\w+')
+# Сколько самых новых совпадений ранжируется. bm25 считается для каждой
+# найденной строки, и без окна частое слово на миллионах постов
+# стоило бы сотни миллисекунд.
+SEARCH_RESULTS_LIMIT: int = 1000
+
+
+def search_supported() -> bool:
+    return connection.vendor == 'sqlite'
+
+
+def match_query(text: str) -> str:
+    """Запрос FTS5 из пользовательской строки.
+
+    Каждое слово ищется как префикс, все слова должны встретиться.
+    Слова берутся в кавычки, поэтому операторы FTS5 в строке
+    не интерпретируются.
+    """
+    return ' '.join(f'"{word}"*' for word in SEARCH_WORD.findall(text))
+
+
+def matching_ids(text: str) -> RawSQL:
+    """Подзапрос id постов, найденных индексом, для filter(pk__in=...)."""
+    return RawSQL(
+        f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s',
+        [match_query(text)])
+
+
+class SearchResults:
+    """Посты, найденные по тексту, от самых релевантных.
+
+    Как и MergedFeed, подходит для post_obj: страница выбирается
+    из индекса одним запросом с сортировкой по bm25 и LIMIT,
+    а сами посты догружаются через in_bulk. Ранжируются и листаются
+    только SEARCH_RESULTS_LIMIT самых новых совпадений, поэтому
+    count() не больше него, а total - число всех совпадений.
+    Без FTS5 ищет через icontains и сортирует по дате.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.query = match_query(text)
+        self.limit = SEARCH_RESULTS_LIMIT
+
+    @cached_property
+    def fallback(self):
+        return hydrate_posts(Post.objects.filter(
+            text__icontains=self.text.strip()))
+
+    @property
+    def window(self) -> str:
+        return (f'SELECT rowid, rank FROM {SEARCH_TABLE} '
+                f'WHERE {SEARCH_TABLE} MATCH %s '
+                f'ORDER BY rowid DESC LIMIT {self.limit}')
+
+    @cached_property
+    def total(self) -> int:
+        """Количество всех совпадений. Считается без bm25."""
+        if not self.query:
+            return 0
+        if not search_supported():
+            return self.fallback.count()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT count(*) FROM {SEARCH_TABLE} '
+                f'WHERE {SEARCH_TABLE} MATCH %s', [self.query])
+            return cursor.fetchone()[0]
+
+    @property
+    def capped(self) -> bool:
+        return self.total > self.limit
+
+    def count(self) -> int:
+        return min(self.total, self.limit)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        if not self.query:
+            return []
+        if not search_supported():
+            return list(self.fallback[:self.limit][index])
+        start, stop = index.start or 0, index.stop
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM ({self.window}) '
+                f'ORDER BY rank LIMIT %s OFFSET %s',
+                [self.query, stop - start, start])
+            ids = [row[0] for row in cursor.fetchall()]
+        posts = hydrate_posts(Post.objects).in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
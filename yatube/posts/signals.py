@@ -0,0 +1,224 @@
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from core.cache import invalidate_tags
+
+from .counters import change_comments_count, change_user_stats
+from .feeds import fan_out_post, follow_author, unfollow_author
+from .images import oriented_size
+from .media import acquire_image, release_image
+from .models import Comment, Follow, Group, Post, User, UserStats
+from .utils import (FEED_TAG, author_tag, count_cache_key, follow_tag,
+                    group_tag, invalidate_counts, post_tag)
+
+
+def post_count_keys(post: Post, *group_ids) -> list:
+    """Ключи количеств всех лент, в которые попадает пост.
+
+    Ленты автора и подписок считают посты по счетчикам UserStats.
+    """
+    return [
+        count_cache_key('index'),
+    ] + [
+        count_cache_key('group', group_id)
+        for group_id in group_ids if group_id is not None
+    ]
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_group(sender, instance, **kwargs):
+    """Запоминает прежние группу и картинку редактируемого поста."""
+    instance._previous_group_id = None
+    instance._previous_image = ''
+    if instance.pk is None:
+        return
+    previous = Post.objects.filter(pk=instance.pk).values_list(
+        'group_id', 'image').first()
+    if previous is not None:
+        instance._previous_group_id, instance._previous_image = previous
+
+
+@receiver(pre_save, sender=Post)
+def store_image_size(sender, instance, raw=False, **kwargs):
+    """Размеры новой картинки с учетом поворота читаются из заголовка
+    загруженного файла.
+
+    Миниатюры прежней картинки сбрасываются. Картинка, заданная
+    именем файла, не читается: ее размеры заполнит generate_thumbnails.
+    """
+    image = instance.image
+    if raw or image.name == instance._previous_image and image._committed:
+        return
+    instance.image_width = instance.image_height = None
+    instance.image_thumbnails = ''
+    if image and not image._committed:
+        instance.image_width, instance.image_height = oriented_size(image)
+
+
+@receiver(post_save, sender=Post)
+def count_image_references(sender, instance, raw=False, **kwargs):
+    """Новая картинка поста получает ссылку, прежняя ее теряет."""
+    previous_image = getattr(instance, '_previous_image', '')
+    if raw or instance.image.name == previous_image:
+        return
+    acquire_image(instance.image.name)
+    release_image(previous_image)
+
+
+@receiver(post_delete, sender=Post)
+def release_deleted_image(sender, instance, **kwargs):
+    release_image(instance.image.name)
+
+
+@receiver(post_save, sender=Post)
+def refresh_counts_on_post_save(sender, instance, created, **kwargs):
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    if created:
+        invalidate_counts(*post_count_keys(instance, instance.group_id))
+    elif previous_group_id != instance.group_id:
+        invalidate_counts(
+            count_cache_key('group', previous_group_id),
+            count_cache_key('group', instance.group_id))
+
+
+@receiver(post_delete, sender=Post)
+def refresh_counts_on_post_delete(sender, instance, **kwargs):
+    invalidate_counts(*post_count_keys(instance, instance.group_id))
+
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        fan_out_post(instance)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_pages(sender, instance, **kwargs):
+    invalidate_tags(
+        FEED_TAG,
+        post_tag(instance.pk),
+        author_tag(instance.author_id),
+        group_tag(instance.group_id),
+        group_tag(getattr(instance, '_previous_group_id', None)))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_pages(sender, instance, **kwargs):
+    invalidate_tags(FEED_TAG, post_tag(instance.post_id))
+
+
+@receiver(post_save, sender=Comment)
+def refresh_counts_on_comment_save(sender, instance, created, **kwargs):
+    if created:
+        invalidate_counts(count_cache_key('comments'))
+
+
+@receiver(post_delete, sender=Comment)
+def refresh_counts_on_comment_delete(sender, instance, **kwargs):
+    invalidate_counts(count_cache_key('comments'))
+
+
+def group_author_ids(group: Group):
+    return Post.objects.filter(group=group).values_list(
+        'author_id', flat=True).distinct()
+
+
+@receiver(pre_delete, sender=Group)
+def remember_group_authors(sender, instance, **kwargs):
+    """Запоминает авторов группы: после удаления ее посты уже
+    без группы."""
+    instance._author_ids = list(group_author_ids(instance))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_pages(sender, instance, created=False, **kwargs):
+    """Название группы выводится в постах ее авторов на их страницах."""
+    author_ids = getattr(instance, '_author_ids', None)
+    if author_ids is None:
+        author_ids = [] if created else group_author_ids(instance)
+    invalidate_tags(
+        FEED_TAG,
+        group_tag(instance.pk),
+        *(author_tag(author_id) for author_id in author_ids))
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_pages(sender, instance, created, update_fields=None,
+                            **kwargs):
+    """Имя автора выводится в его постах, группах и комментариях."""
+    if created or (update_fields is not None
+                   and set(update_fields) == {'last_login'}):
+        return
+    groups = Post.objects.filter(author=instance).values_list(
+        'group_id', flat=True).distinct()
+    posts = Comment.objects.filter(author=instance).values_list(
+        'post_id', flat=True).distinct()
+    invalidate_tags(
+        FEED_TAG,
+        author_tag(instance.pk),
+        *(group_tag(group_id) for group_id in groups),
+        *(post_tag(post_id) for post_id in posts))
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def count_new_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        change_user_stats(instance.author_id, posts_count=1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    change_user_stats(instance.author_id, posts_count=-1)
+
+
+@receiver(post_save, sender=Follow)
+def count_new_follow(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        change_user_stats(instance.author_id, followers_count=1)
+        change_user_stats(instance.user_id, following_count=1)
+    invalidate_tags(author_tag(instance.author_id),
+                    author_tag(instance.user_id))
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    change_user_stats(instance.author_id, followers_count=-1)
+    change_user_stats(instance.user_id, following_count=-1)
+    invalidate_tags(author_tag(instance.author_id),
+                    author_tag(instance.user_id))
+
+
+# Ленты обновляются после счетчиков подписок выше: follow_author
+# решает по уже измененному числу подписчиков автора.
+@receiver(post_save, sender=Follow)
+def update_timeline_on_follow(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        follow_author(instance.user_id, instance.author_id)
+        invalidate_tags(follow_tag(instance.user_id))
+
+
+@receiver(post_delete, sender=Follow)
+def update_timeline_on_unfollow(sender, instance, **kwargs):
+    unfollow_author(instance.user_id, instance.author_id)
+    invalidate_tags(follow_tag(instance.user_id))
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        change_comments_count(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    change_comments_count(instance.post_id, -1)
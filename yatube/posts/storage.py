@@ -0,0 +1,58 @@
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+DIGEST_NAME = re.compile(r'(?:.*/)?[0-9a-f]{2}/[0-9a-f]{64}(?:\.\w+)?$')
+TEMPORARY_PREFIX = '.upload-'
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранилище, в котором имя файла - хеш его содержимого.
+
+    Файл хешируется по кускам во время записи во временный файл рядом
+    с итоговым. Одинаковые загрузки получают одно имя и один файл,
+    а значит, и одни миниатюры.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def _save(self, name, content):
+        directory, extension = (
+            os.path.dirname(name), os.path.splitext(name)[1].lower())
+        os.makedirs(self.path(directory), exist_ok=True)
+        descriptor, temporary_path = tempfile.mkstemp(
+            dir=self.path(directory), prefix=TEMPORARY_PREFIX)
+        try:
+            digest = hashlib.sha256()
+            with os.fdopen(descriptor, 'wb') as file:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    file.write(chunk)
+            digest = digest.hexdigest()
+            name = f'{directory}/{digest[:2]}/{digest}{extension}'
+            path = self.path(name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if os.path.exists(path):
+                # Свежее время изменения защищает файл от удаления
+                # последней ссылки, пока новый пост еще не сохранен.
+                os.utime(path)
+            else:
+                os.chmod(temporary_path, self.file_permissions_mode or 0o644)
+                os.replace(temporary_path, path)
+        finally:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+        return name
+
+
+image_storage = ContentAddressedStorage()
+
+
+def is_content_addressed(name: str) -> bool:
+    return bool(DIGEST_NAME.match(name))
@@ -0,0 +1,19 @@
+from django import template
+
+from posts.utils import page_window
+
+register = template.Library()
+
+
+@register.filter(name='page_window')
+def page_window_filter(page_obj):
+    return page_window(page_obj)
+
+
+@register.simple_tag
+def post_image(post, name):
+    """Адрес и размеры миниатюры name картинки поста.
+
+    Пока миниатюры нет, отдает саму картинку. Читает только поля поста.
+    """
+    return post.image_variant(name)
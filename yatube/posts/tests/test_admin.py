@@ -0,0 +1,123 @@
+'''
+[X] - навигация по датам находит те же даты и границы,
+      что и QuerySet.dates и aggregate
+[X] - число запросов списка не зависит от числа строк
+[X] - количество постов без фильтров берется из кеша
+[X] - в списках нет выпадающих списков всех групп и пользователей
+'''
+from datetime import datetime
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, Max, Min, QuerySet
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ..admin import IndexedDatesQuerySet
+from ..models import Comment, Group, Post, User
+
+DATES = [
+    datetime(2020, 12, 31, 23, 59), datetime(2021, 1, 1),
+    datetime(2021, 1, 15, 12), datetime(2021, 1, 15, 13),
+    datetime(2021, 3, 1), datetime(2022, 2, 28, 8),
+]
+
+
+class AdminTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='admin')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        for pub_date in DATES:
+            post = Post.objects.create(
+                author=cls.admin, group=cls.group, text='Пост')
+            Comment.objects.create(post=post, author=cls.admin, text='Ок')
+            Post.objects.filter(pk=post.pk).update(
+                pub_date=timezone.make_aware(pub_date))
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def test_indexed_dates(self):
+        """Навигация по датам совпадает с обычным dates()."""
+        indexed = IndexedDatesQuerySet(Post)
+        for kind in ('year', 'month', 'day'):
+            for order in ('ASC', 'DESC'):
+                for lookups in ({}, {'pub_date__year': 2021},
+                                {'pub_date__year': 2021,
+                                 'pub_date__month': 1}):
+                    with self.subTest(kind=kind, order=order, **lookups):
+                        self.assertEqual(
+                            list(indexed.filter(**lookups).dates(
+                                'pub_date', kind, order)),
+                            list(QuerySet(Post).filter(**lookups).dates(
+                                'pub_date', kind, order)))
+
+    def test_indexed_bounds(self):
+        """Min и Max по отдельности совпадают с обычным aggregate()."""
+        aggregates = {'first': Min('pub_date'), 'last': Max('pub_date'),
+                      'last_pk': Max('pk')}
+        for lookups in ({}, {'pub_date__year': 2021}, {'pk': 0}):
+            with self.subTest(**lookups):
+                self.assertEqual(
+                    IndexedDatesQuerySet(Post).filter(**lookups).aggregate(
+                        **aggregates),
+                    QuerySet(Post).filter(**lookups).aggregate(**aggregates))
+        self.assertEqual(
+            IndexedDatesQuerySet(Post).aggregate(posts=Count('pk')),
+            {'posts': len(DATES)})
+
+    def changelist_queries(self, model: str, **params) -> int:
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse(f'admin:posts_{model}_changelist'), params)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow(self):
+        """Число запросов списка не зависит от числа строк."""
+        for model in ('post', 'comment'):
+            with self.subTest(model=model):
+                params = {'pub_date__year': 2021, 'pub_date__month': 1}
+                before = self.changelist_queries(model, **params)
+                other = User.objects.create_user(username=f'{model}-other')
+                post = Post.objects.create(author=other, text='Еще')
+                Comment.objects.create(post=post, author=other, text='Еще')
+                Post.objects.filter(pk=post.pk).update(
+                    pub_date=timezone.make_aware(datetime(2021, 1, 15, 18)))
+                Comment.objects.filter(post=post).update(
+                    pub_date=timezone.make_aware(datetime(2021, 1, 15, 18)))
+                self.assertEqual(
+                    self.changelist_queries(model, **params), before)
+
+    def test_changelist_count_is_cached(self):
+        """Без фильтров список не считает строки таблицы заново."""
+        for model in ('post', 'comment'):
+            with self.subTest(model=model):
+                self.changelist_queries(model)
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(
+                        reverse(f'admin:posts_{model}_changelist'))
+                self.assertEqual(
+                    response.context['cl'].result_count, len(DATES))
+                self.assertFalse(any(
+                    'COUNT(' in query['sql'] for query in queries))
+
+    def test_no_full_selects(self):
+        """Группы и пользователи выбираются без списков всех объектов."""
+        response = self.client.get(reverse('admin:posts_post_changelist'))
+        self.assertNotContains(response, '<select name="form-0-group"')
+        response = self.client.get(reverse('admin:posts_comment_changelist'))
+        self.assertNotContains(response, 'author__id__exact')
+        other = Group.objects.create(title='Другая группа', slug='other')
+        post = Post.objects.first()
+        response = self.client.get(
+            reverse('admin:posts_post_change', args=(post.pk,)))
+        self.assertContains(response, 'admin-autocomplete')
+        self.assertNotContains(response, other.title)
@@ -0,0 +1,107 @@
+'''
+[X] - счетчики постов, подписчиков, подписок и комментариев
+      обновляются при записи и удалении
+[X] - удаление пользователя с подписками и подписчиками не уводит
+      счетчики других пользователей ниже нуля
+[X] - удаление комментария, созданного без сигнала, не уводит
+      счетчик комментариев ниже нуля
+[X] - rebuild_counters находит и исправляет расхождения
+[X] - страницы читают счетчики без COUNT-запросов
+'''
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Post, User, UserStats
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.author = User.objects.create_user(username='author')
+
+    def stats(self, user) -> tuple:
+        stats = UserStats.objects.get(user=user)
+        return (stats.posts_count, stats.followers_count,
+                stats.following_count)
+
+    def test_counters_follow_writes(self):
+        """Счетчики меняются вместе с постами, подписками и комментариями."""
+        post = Post.objects.create(author=self.author)
+        follow = Follow.objects.create(user=self.user, author=self.author)
+        comment = Comment.objects.create(post=post, author=self.user)
+        post.refresh_from_db()
+        self.assertEqual(self.stats(self.author), (1, 1, 0))
+        self.assertEqual(self.stats(self.user), (0, 0, 1))
+        self.assertEqual(post.comments_count, 1)
+
+        comment.delete()
+        follow.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        post.delete()
+        self.assertEqual(self.stats(self.author), (0, 0, 0))
+        self.assertEqual(self.stats(self.user), (0, 0, 0))
+
+    def test_delete_user_with_follows(self):
+        """Удаление пользователя, который подписан и на которого
+        подписаны, поправляет счетчики остальных."""
+        user = User.objects.create_user(username='leaving')
+        Follow.objects.create(user=user, author=self.author)
+        Follow.objects.create(user=self.user, author=user)
+        Post.objects.create(author=user)
+        user.delete()
+        self.assertEqual(self.stats(self.author), (0, 0, 0))
+        self.assertEqual(self.stats(self.user), (0, 0, 0))
+        self.assertFalse(UserStats.objects.filter(pk=user.pk).exists())
+
+    def test_delete_comment_without_signal(self):
+        """Комментарий из bulk_create удаляется без ошибки, счетчик
+        остается нулем."""
+        post = Post.objects.create(author=self.author)
+        Comment.objects.bulk_create([Comment(post=post, author=self.user)])
+        Comment.objects.filter(post=post).delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        Comment.objects.bulk_create([Comment(post=post, author=self.user)])
+        post.delete()
+        self.assertFalse(Comment.objects.filter(post=post).exists())
+
+    def test_rebuild_counters(self):
+        """rebuild_counters находит и исправляет расхождения."""
+        post = Post.objects.create(author=self.author)
+        Comment.objects.bulk_create([Comment(post=post, author=self.user)])
+        UserStats.objects.filter(user=self.author).update(posts_count=5)
+        UserStats.objects.filter(user=self.user).delete()
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_counters', check=True, stdout=StringIO())
+        call_command('rebuild_counters', chunk_size=1, stdout=StringIO())
+        call_command('rebuild_counters', check=True, stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(self.stats(self.author), (1, 0, 0))
+        self.assertEqual(self.stats(self.user), (0, 0, 0))
+        self.assertEqual(post.comments_count, 1)
+
+    def test_pages_read_counters(self):
+        """Профиль и страница поста не считают посты запросами."""
+        post = Post.objects.create(author=self.author)
+        urls = [
+            reverse('posts:profile', kwargs={'username': self.author}),
+            reverse('posts:post_detail', kwargs={'post_id': post.pk}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    response = Client().get(url)
+                self.assertContains(response, 'Всего постов')
+                self.assertFalse([
+                    query for query in queries
+                    if 'COUNT(' in query['sql']
+                ])
@@ -3,6 +3,7 @@
 [X] - Форма правит пост
 [X] - Форма CommentForm сохраняет новый комментарий
 '''
+import hashlib
 import shutil
 import tempfile
 
@@ -15,6 +16,16 @@ from ..models import Comment, Group, Post, User
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 FILE_NAME = 'test.gif'
+TEST_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x01\x00'
+    b'\x01\x00\x00\x00\x00\x21\xf9\x04'
+    b'\x01\x0a\x00\x01\x00\x2c\x00\x00'
+    b'\x00\x00\x01\x00\x01\x00\x00\x02'
+    b'\x02\x4c\x01\x00\x3b'
+)
+# Картинки хранятся под хешем содержимого.
+DIGEST = hashlib.sha256(TEST_GIF).hexdigest()
+STORED_NAME = f'posts/{DIGEST[:2]}/{DIGEST}.gif'
 
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
@@ -39,16 +50,9 @@ class PostCreateFormTests(TestCase):
         """Создание картинки и сбор данных в словарь
         с полями Post.
         """
-        test_gif = (
-            b'\x47\x49\x46\x38\x39\x61\x01\x00'
-            b'\x01\x00\x00\x00\x00\x21\xf9\x04'
-            b'\x01\x0a\x00\x01\x00\x2c\x00\x00'
-            b'\x00\x00\x01\x00\x01\x00\x00\x02'
-            b'\x02\x4c\x01\x00\x3b'
-        )
         uploaded = SimpleUploadedFile(
             name=FILE_NAME,
-            content=test_gif,
+            content=TEST_GIF,
             content_type='image/gif')
         return {'text': post_text,
                 'group': PostCreateFormTests.group.id,
@@ -69,7 +73,7 @@ class PostCreateFormTests(TestCase):
                 text=form_data['text'],
                 author=PostCreateFormTests.user,
                 group=PostCreateFormTests.group,
-                image=f'posts/{FILE_NAME}').exists())
+                image=STORED_NAME).exists())
 
     def test_form_edit_post(self):
         """Валидная форма редактирует запись в Post."""
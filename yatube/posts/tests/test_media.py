@@ -0,0 +1,237 @@
+'''
+[X] - картинка хранится под хешем содержимого, одинаковые загрузки
+      делят один файл
+[X] - посты с одной картинкой делят миниатюры, файл обрабатывается
+      один раз
+[X] - счетчик ссылок растет и убывает при создании, правке
+      и удалении постов
+[X] - файл и миниатюры удаляются вместе с последней ссылкой,
+      недавно загруженный снова файл и файлы с именами из загрузки
+      остаются
+[X] - collect_media находит картинки, варианты и миниатюры sorl без
+      ссылок, удаляет их или переносит в карантин, свежие файлы
+      и файлы вне своих каталогов не трогает
+'''
+import hashlib
+import os
+import shutil
+import stat
+import tempfile
+import time
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from sorl.thumbnail import default as sorl
+from sorl.thumbnail.images import ImageFile
+
+from .. import thumbnails
+from ..media import delete_unreferenced
+from ..models import MediaFile, Post, User
+from ..storage import image_storage
+from .utils import image_content, image_file
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POSTS_IMAGE_DELETE_DELAY=0)
+class MediaTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.callbacks = []
+        patcher = mock.patch(
+            'django.db.transaction.on_commit', self.callbacks.append)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def commit(self) -> None:
+        """Выполняет действия, отложенные до коммита."""
+        callbacks, self.callbacks[:] = self.callbacks[:], []
+        for callback in callbacks:
+            callback()
+
+    def create_post(self, name: str, content: bytes) -> Post:
+        return Post.objects.create(
+            author=self.user, text='Пост', image=image_file(name, content))
+
+    def references(self, name: str) -> int:
+        return MediaFile.objects.get(name=name).references
+
+    def test_identical_uploads_share_file(self):
+        """Одинаковые загрузки получают одно имя и один файл."""
+        content = image_content()
+        first = self.create_post('meme.png', content)
+        second = self.create_post('MEME copy.PNG', content)
+        other = self.create_post('meme.png', image_content(color='blue'))
+        digest = hashlib.sha256(content).hexdigest()
+        self.assertEqual(first.image.name,
+                         f'posts/{digest[:2]}/{digest}.png')
+        self.assertEqual(second.image.name, first.image.name)
+        self.assertNotEqual(other.image.name, first.image.name)
+        directory = os.path.dirname(image_storage.path(first.image.name))
+        self.assertEqual(os.listdir(directory), [f'{digest}.png'])
+        mode = os.stat(image_storage.path(first.image.name)).st_mode
+        self.assertEqual(stat.S_IMODE(mode), 0o644)
+        self.assertEqual(self.references(first.image.name), 2)
+
+    @override_settings(POSTS_THUMBNAIL_WORKERS=0)
+    def test_shared_thumbnails(self):
+        """Миниатюры общей картинки создаются один раз."""
+        content = image_content()
+        first = self.create_post('a.png', content)
+        second = self.create_post('b.png', content)
+        thumbnails.generate_thumbnails(first.image.name, first.pk)
+        with mock.patch.object(thumbnails, 'process_image') as process:
+            thumbnails.generate_thumbnails(second.image.name, second.pk)
+        process.assert_not_called()
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertNotEqual(second.image_thumbnails, '')
+        self.assertEqual(second.image_thumbnails, first.image_thumbnails)
+
+    def test_references_follow_posts(self):
+        """Правка и удаление поста снимают ссылку с прежней картинки."""
+        content = image_content()
+        first = self.create_post('a.png', content)
+        second = self.create_post('b.png', content)
+        name = first.image.name
+        first.text = 'Правка'
+        first.save()
+        self.assertEqual(self.references(name), 2)
+        first.image = image_file('c.png', color='blue')
+        first.save()
+        self.assertEqual(self.references(name), 1)
+        self.assertEqual(self.references(first.image.name), 1)
+        self.commit()
+        self.assertTrue(image_storage.exists(name))
+        second.delete()
+        self.assertEqual(self.references(name), 0)
+
+    @override_settings(POSTS_THUMBNAIL_WORKERS=0)
+    def test_last_reference_deletes_files(self):
+        """Последняя ссылка удаляет файл и миниатюры после коммита."""
+        post = self.create_post('a.png', image_content())
+        name = post.image.name
+        thumbnails.generate_thumbnails(name, post.pk)
+        post.refresh_from_db()
+        variant = post.image_variant('card')['url'][len(settings.MEDIA_URL):]
+        self.assertTrue(default_storage.exists(variant))
+        post.delete()
+        self.assertTrue(image_storage.exists(name))
+        self.commit()
+        self.assertFalse(image_storage.exists(name))
+        self.assertFalse(default_storage.exists(variant))
+        self.assertFalse(MediaFile.objects.filter(name=name).exists())
+
+    def test_recent_upload_and_legacy_names_stay(self):
+        """Недавно загруженный файл и файл с именем из загрузки
+        не удаляются."""
+        post = self.create_post('a.png', image_content())
+        name = post.image.name
+        post.delete()
+        with override_settings(POSTS_IMAGE_DELETE_DELAY=60):
+            self.commit()
+        self.assertTrue(image_storage.exists(name))
+        self.assertTrue(delete_unreferenced(name))
+        legacy = default_storage.save('posts/legacy.png', BytesIO(b'x'))
+        Post.objects.create(author=self.user, text='Пост', image=legacy)
+        Post.objects.filter(image=legacy).delete()
+        self.commit()
+        self.assertTrue(default_storage.exists(legacy))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POSTS_THUMBNAIL_WORKERS=0)
+class CollectMediaTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    def setUp(self):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        self.addCleanup(shutil.rmtree, TEMP_MEDIA_ROOT, True)
+        post = Post.objects.create(
+            author=self.user, text='Пост', image=image_file('a.png'))
+        thumbnails.generate_thumbnails(post.image.name, post.pk)
+        orphan = image_storage.save(
+            'posts/b.png', ContentFile(image_content(color='blue')))
+        thumbnails.generate_thumbnails(orphan, 0)
+        MediaFile.objects.create(name=orphan)
+        legacy = default_storage.save('posts/legacy.png', ContentFile(b'x'))
+        Post.objects.create(author=self.user, text='Пост', image=legacy)
+        self.sorl_thumbnail = default_storage.save(
+            'cache/ab/cd/thumb.png', ContentFile(image_content()))
+        sorl.kvstore.set(ImageFile(self.sorl_thumbnail, sorl.storage))
+        default_storage.save('other/keep.txt', ContentFile(b'x'))
+        hour_ago = time.time() - 60 * 60 * 2
+        for directory, _, files in os.walk(TEMP_MEDIA_ROOT):
+            for file_name in files:
+                path = os.path.join(directory, file_name)
+                os.utime(path, (hour_ago, hour_ago))
+        self.fresh = image_storage.save(
+            'posts/c.png', ContentFile(image_content(color='green')))
+        self.kept = [post.image.name, legacy, self.fresh, 'other/keep.txt',
+                     *self.variants(post.image.name)]
+        self.orphans = [orphan, self.sorl_thumbnail, *self.variants(orphan)]
+
+    def variants(self, name: str) -> list:
+        directory = f'variants/{os.path.splitext(name)[0]}'
+        return [f'{directory}/{file_name}'
+                for file_name in default_storage.listdir(directory)[1]]
+
+    def collect(self, *args) -> str:
+        out = StringIO()
+        call_command('collect_media', *args, stdout=out)
+        return out.getvalue()
+
+    def assertFiles(self, names: list, exist: bool, root=TEMP_MEDIA_ROOT):
+        for name in names:
+            with self.subTest(name=name):
+                self.assertEqual(
+                    os.path.exists(os.path.join(root, name)), exist)
+
+    def test_dry_run(self):
+        """Без флагов файлы только находятся."""
+        output = self.collect('--verbosity', '2')
+        self.assertIn(f'Найдено файлов без ссылок: {len(self.orphans)}',
+                      output)
+        for name in self.orphans:
+            self.assertIn(name, output)
+        self.assertFiles(self.orphans, exist=True)
+
+    def test_delete(self):
+        """--delete удаляет файлы без ссылок, счетчики и записи sorl."""
+        output = self.collect('--delete', '--batch-size', '1')
+        self.assertIn(f'Удалено файлов без ссылок: {len(self.orphans)}',
+                      output)
+        self.assertFiles(self.orphans, exist=False)
+        self.assertFiles(self.kept, exist=True)
+        self.assertFalse(os.path.exists(
+            os.path.join(TEMP_MEDIA_ROOT, 'cache', 'ab')))
+        self.assertFalse(MediaFile.objects.filter(
+            name=self.orphans[0]).exists())
+        self.assertIsNone(sorl.kvstore.get(
+            ImageFile(self.sorl_thumbnail, sorl.storage)))
+        self.assertIn('файлов без ссылок: 0', self.collect())
+
+    def test_quarantine(self):
+        """--quarantine переносит файлы с теми же путями."""
+        quarantine = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, quarantine, True)
+        self.collect('--quarantine', quarantine)
+        self.assertFiles(self.orphans, exist=False)
+        self.assertFiles(self.orphans, exist=True, root=quarantine)
+        self.assertFiles(self.kept, exist=True)
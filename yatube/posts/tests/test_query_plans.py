@@ -0,0 +1,103 @@
+'''
+[X] - запросы лент и страниц поста идут по индексам:
+      без полного сканирования таблиц posts и без временной сортировки
+[X] - списки постов и комментариев в админке тоже
+'''
+import re
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+
+TEMP_B_TREE = re.compile(r'USE TEMP B-TREE')
+# Старый формат SQLite пишет SCAN TABLE, новый просто SCAN;
+# таблицы в подзапросах Django называет псевдонимами вида U0.
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?(?P<table>\w+)(?!.*USING)')
+
+
+class QueryPlanTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='admin')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(slug='test-slug')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Тестовый пост')
+        Comment.objects.create(post=cls.post, author=cls.user)
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def urls(self) -> list:
+        return [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+            reverse('posts:follow_index'),
+        ]
+
+    def plans(self, client, url: str) -> list:
+        """Планы всех SELECT-запросов, выполненных при открытии url."""
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            client.get(url)
+        plans = []
+        with connection.cursor() as cursor:
+            for query in queries:
+                if not query['sql'].startswith('SELECT'):
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                plans.append(
+                    (query['sql'], [row[-1] for row in cursor.fetchall()]))
+        return plans
+
+    def assertIndexedPlans(self, client, url: str):
+        for sql, plan in self.plans(client, url):
+            for step in plan:
+                with self.subTest(url=url, sql=sql, step=step):
+                    self.assertIsNone(TEMP_B_TREE.search(step))
+                    scan = FULL_SCAN.search(step)
+                    self.assertFalse(
+                        scan and not scan['table'].startswith('django_'))
+
+    def test_pages_use_indexes(self):
+        """Страницы читают посты по индексам без сортировки в памяти."""
+        for url in self.urls():
+            self.assertIndexedPlans(Client(), url)
+            self.assertIndexedPlans(self.authorized_client, url)
+
+    def test_feed_engines_and_cursor_use_indexes(self):
+        """Лента подписок и курсорные страницы тоже идут по индексам."""
+        for engine in ('timeline', 'merge'):
+            with override_settings(POSTS_FOLLOW_FEED_ENGINE=engine):
+                self.assertIndexedPlans(
+                    self.authorized_client, reverse('posts:follow_index'))
+        with override_settings(POSTS_KEYSET_PAGINATION=True):
+            for url in self.urls():
+                self.assertIndexedPlans(self.authorized_client, url)
+
+    def test_admin_changelists_use_indexes(self):
+        """Списки админки и навигация по датам идут по индексам."""
+        client = Client()
+        client.force_login(self.admin)
+        date = self.post.pub_date
+        for model in ('post', 'comment'):
+            url = reverse(f'admin:posts_{model}_changelist')
+            for params in ('', f'?pub_date__year={date.year}',
+                           f'?pub_date__year={date.year}'
+                           f'&pub_date__month={date.month}',
+                           f'?pub_date__year={date.year}'
+                           f'&pub_date__month={date.month}'
+                           f'&pub_date__day={date.day}'):
+                self.assertIndexedPlans(client, url + params)
@@ -0,0 +1,143 @@
+'''
+[X] - поиск находит посты по словам и их началу, релевантные выше
+[X] - индекс обновляется при создании, правке, удалении
+      и массовой вставке постов
+[X] - после миграций у posts_post есть триггеры индекса, а сам
+      индекс согласован с таблицей
+[X] - ранжируются и листаются только самые новые совпадения,
+      а считаются все, и об этом сказано на странице
+[X] - операторы FTS5 в запросе не ломают поиск
+[X] - паджинатор поиска сохраняет запрос в ссылках
+[X] - поиск в админке идет через индекс
+'''
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Post, User
+from ..search import SEARCH_TABLE
+from ..views import COUNT_POST_ON_PAGE
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.one_match = Post.objects.create(
+            author=cls.user, text='Прогулка по лесу и река')
+        cls.two_matches = Post.objects.create(
+            author=cls.user, text='Лесная река, река у леса')
+        Post.objects.create(author=cls.user, text='Город ночью')
+
+    def search(self, query: str, **params) -> list:
+        cache.clear()
+        response = self.client.get(
+            reverse('posts:search'), {'q': query, **params})
+        return list(response.context['page_obj'])
+
+    def test_search_ranks_results(self):
+        """Находит посты по словам и их началу, релевантные выше."""
+        self.assertEqual(self.search('река'),
+                         [self.two_matches, self.one_match])
+        self.assertEqual(self.search('лес РЕК'),
+                         [self.two_matches, self.one_match])
+        self.assertEqual(self.search('Прогул'), [self.one_match])
+        self.assertEqual(self.search('пустыня'), [])
+        self.assertEqual(self.search(''), [])
+
+    def test_search_index_follows_changes(self):
+        """Индекс обновляется при записи постов любым способом."""
+        post = Post.objects.create(author=self.user, text='Пустыня')
+        self.assertEqual(self.search('пустыня'), [post])
+        Post.objects.filter(pk=post.pk).update(text='Степь')
+        self.assertEqual(self.search('пустыня'), [])
+        self.assertEqual(self.search('степь'), [post])
+        post.delete()
+        self.assertEqual(self.search('степь'), [])
+        Post.objects.bulk_create([Post(author=self.user, text='Тундра')])
+        self.assertEqual(len(self.search('тундра')), 1)
+
+    def test_search_triggers_after_migrations(self):
+        """Миграции, пересоздающие posts_post, возвращают триггеры."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' "
+                "AND tbl_name = 'posts_post'")
+            triggers = {row[0] for row in cursor.fetchall()}
+            cursor.execute(
+                f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) "
+                f"VALUES ('integrity-check')")
+        self.assertEqual(triggers, {
+            f'{SEARCH_TABLE}_{action}'
+            for action in ('insert', 'delete', 'update')})
+
+    def test_search_ranks_newest_matches(self):
+        """Ранжируются только самые новые совпадения."""
+        with mock.patch('posts.search.SEARCH_RESULTS_LIMIT', 1):
+            self.assertEqual(self.search('река'), [self.two_matches])
+
+    def test_search_count_beyond_limit(self):
+        """Найденное считается полностью, листаются только
+        ранжированные совпадения."""
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Река {i}')
+            for i in range(COUNT_POST_ON_PAGE))
+        with mock.patch('posts.search.SEARCH_RESULTS_LIMIT',
+                        COUNT_POST_ON_PAGE + 1):
+            cache.clear()
+            response = self.client.get(
+                reverse('posts:search'), {'q': 'река', 'page': 2})
+        page_obj = response.context['page_obj']
+        self.assertEqual(len(page_obj), 1)
+        self.assertFalse(page_obj.has_next())
+        self.assertEqual(page_obj.paginator.count, COUNT_POST_ON_PAGE + 1)
+        self.assertContains(
+            response, f'Найдено записей: {COUNT_POST_ON_PAGE + 2}')
+        self.assertContains(
+            response, f'отобраны {COUNT_POST_ON_PAGE + 1} самых новых')
+
+    def test_search_escapes_operators(self):
+        """Операторы FTS5 в запросе считаются обычными словами."""
+        for query in ('река"', 'NOT река', 'река OR', '(река*', 'NEAR(река'):
+            with self.subTest(query=query):
+                response = self.client.get(
+                    reverse('posts:search'), {'q': query})
+                self.assertEqual(response.status_code, 200)
+
+    def test_search_pagination_keeps_query(self):
+        """Ссылки паджинатора сохраняют поисковый запрос."""
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Река {i}')
+            for i in range(COUNT_POST_ON_PAGE))
+        self.assertEqual(len(self.search('река')), COUNT_POST_ON_PAGE)
+        self.assertEqual(len(self.search('река', page=2)), 2)
+        response = self.client.get(reverse('posts:search'), {'q': 'река'})
+        self.assertContains(response, '?q=%D1%80%D0%B5%D0%BA%D0%B0&amp;page=2')
+
+
+class AdminSearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='admin')
+        cls.post = Post.objects.create(author=cls.admin, text='Река')
+        Post.objects.create(author=cls.admin, text='Город')
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке идет через индекс, а не через LIKE."""
+        client = Client()
+        client.force_login(self.admin)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(
+                reverse('admin:posts_post_changelist'), {'q': 'рек'})
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.post])
+        sql = ' '.join(query['sql'] for query in queries)
+        self.assertIn('MATCH', sql)
+        self.assertNotIn('LIKE', sql)
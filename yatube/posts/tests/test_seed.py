@@ -0,0 +1,62 @@
+'''
+[X] - seed создает заданное количество пользователей, групп,
+      постов, комментариев и подписок
+[X] - подписчики распределены по степенному закону
+[X] - даты постов растут вместе с pk, комментарии не старше постов
+[X] - счетчики и ленты подписок согласованы с данными
+'''
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase
+
+from ..feeds import timeline_posts
+from ..models import (Comment, Follow, Group, Post, Timeline, User,
+                      UserStats)
+
+
+class SeedCommandTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command(
+            'seed', users=30, groups=3, posts=200, comments=100,
+            follows=60, batch_size=40, random_seed=1, stdout=StringIO())
+
+    def test_seed_creates_objects(self):
+        """seed создает заданное количество объектов."""
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 100)
+        self.assertEqual(Follow.objects.count(), 60)
+        self.assertFalse(Follow.objects.filter(user=F('author')).exists())
+
+    def test_seed_follows_power_law(self):
+        """Большинство подписок достается немногим авторам."""
+        followers = sorted(UserStats.objects.values_list(
+            'followers_count', flat=True), reverse=True)
+        self.assertGreater(followers[0], 3 * sum(followers) / len(followers))
+
+    def test_seed_dates(self):
+        """Даты постов растут вместе с pk, комментарии не старше постов."""
+        dates = list(Post.objects.order_by('pk').values_list(
+            'pub_date', flat=True))
+        self.assertEqual(dates, sorted(dates))
+        self.assertLess(dates[0], dates[-1])
+        self.assertFalse(Comment.objects.filter(
+            pub_date__lt=F('post__pub_date')).exists())
+
+    def test_seed_counters_and_timelines(self):
+        """Счетчики и ленты подписок согласованы с данными."""
+        call_command('rebuild_counters', check=True, stdout=StringIO())
+        follow = Follow.objects.first()
+        self.assertEqual(
+            {post.pk for post in timeline_posts(follow.user)},
+            set(Post.objects.filter(
+                author__following__user=follow.user).values_list(
+                    'pk', flat=True)))
+        self.assertEqual(
+            Timeline.objects.count(),
+            Post.objects.filter(author__following__isnull=False).count())
@@ -0,0 +1,254 @@
+'''
+[X] - размеры загруженной картинки сохраняются в посте
+[X] - пока миниатюры нет, страницы выводят саму картинку
+      и не обрабатывают ее при отрисовке
+[X] - создание и правка поста с картинкой создают миниатюры
+      после коммита и записывают их в пост, правка без новой
+      картинки - нет
+[X] - смена картинки сбрасывает размеры и миниатюры
+[X] - миниатюры создаются в фоновом потоке, картинка ставится
+      в очередь один раз
+[X] - после создания миниатюр закешированные страницы поста,
+      его группы и профили авторов сбрасываются
+[X] - лента выводится без чтения файлов и хранилища миниатюр
+[X] - generate_thumbnails заполняет посты без размеров и миниатюр
+[X] - варианты создаются в нескольких ширинах для srcset, без EXIF
+      и с примененным поворотом, WebP - если Pillow его поддерживает
+'''
+import json
+import shutil
+import tempfile
+import threading
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image, features
+from sorl.thumbnail import default
+
+from .. import thumbnails
+from ..images import EXIF_ORIENTATION
+from ..models import Group, Post, User
+from .utils import image_file
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+# Картинка уже кадра получает один вариант наименьшей ширины.
+CARD = {'width': 320, 'height': 113}
+
+
+def media_path(url: str) -> str:
+    return url[len(settings.MEDIA_URL):]
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POSTS_THUMBNAIL_WORKERS=0)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.post = Post.objects.create(
+            author=self.user, text='Пост', image=image_file('old.png'))
+
+    def test_upload_stores_size(self):
+        """Размеры загруженной картинки сохраняются без миниатюр."""
+        self.post.refresh_from_db()
+        self.assertEqual(
+            (self.post.image_width, self.post.image_height), (40, 30))
+        self.assertEqual(self.post.image_thumbnails, '')
+        self.assertIsNone(Post(text='Без картинки').image_variant('card'))
+
+    def test_fallback_to_image(self):
+        """Без миниатюры выводится картинка, и миниатюра не создается."""
+        with mock.patch.object(thumbnails, 'process_image') as process_image:
+            response = self.client.get(
+                reverse('posts:post_detail', args=(self.post.pk,)))
+        process_image.assert_not_called()
+        self.assertContains(response, f'src="{self.post.image.url}"')
+        self.assertContains(response, 'width="40" height="30"')
+
+    def post_and_commit(self, url: str, data: dict) -> None:
+        """Отправляет форму и выполняет отложенные до коммита действия."""
+        callbacks = []
+        with mock.patch('django.db.transaction.on_commit', callbacks.append):
+            self.client.post(url, data)
+        for callback in callbacks:
+            callback()
+
+    def test_create_and_edit_store_thumbnails(self):
+        """Новая картинка поста получает миниатюры после сохранения."""
+        self.post_and_commit(reverse('posts:post_create'), {
+            'text': 'Новый', 'image': image_file('new.png', size=(1200, 500))})
+        post = Post.objects.get(text='Новый')
+        card = post.image_variant('card')
+        self.assertNotEqual(card['url'], post.image.url)
+        self.assertTrue(default_storage.exists(media_path(card['url'])))
+        self.assertEqual((card['width'], card['height']), (960, 339))
+        self.assertEqual((post.image_width, post.image_height), (1200, 500))
+        self.post_and_commit(
+            reverse('posts:post_edit', args=(self.post.pk,)),
+            {'text': 'Правка', 'image': image_file('edit.png')})
+        self.post.refresh_from_db()
+        self.assertIn('card', json.loads(self.post.image_thumbnails))
+
+    def test_edit_without_image_change_skips(self):
+        """Правка текста не ставит картинку в очередь."""
+        with mock.patch.object(thumbnails, 'submit_thumbnails') as submit:
+            self.post_and_commit(
+                reverse('posts:post_edit', args=(self.post.pk,)),
+                {'text': 'Правка'})
+        submit.assert_not_called()
+
+    def test_image_change_resets_metadata(self):
+        """Смена картинки сбрасывает размеры и миниатюры прежней."""
+        thumbnails.generate_thumbnails(self.post.image.name, self.post.pk)
+        self.post.refresh_from_db()
+        self.post.text = 'Правка'
+        self.post.save()
+        self.assertNotEqual(self.post.image_thumbnails, '')
+        self.post.image = 'posts/other.png'
+        self.post.save()
+        self.assertEqual(self.post.image_thumbnails, '')
+        self.assertIsNone(self.post.image_width)
+        self.post.image = None
+        self.post.save()
+        self.assertIsNone(self.post.image_variant('card'))
+
+    def test_generated_thumbnail_resets_cached_pages(self):
+        """Закешированная страница показывает миниатюру после ее создания."""
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        self.assertContains(Client().get(url), self.post.image.url)
+        thumbnails.generate_thumbnails(self.post.image.name, self.post.pk)
+        self.post.refresh_from_db()
+        self.assertContains(
+            Client().get(url),
+            f'src="{self.post.image_variant("card")["url"]}"')
+
+    def test_generated_thumbnail_resets_cached_group_page(self):
+        """Закешированная страница группы показывает миниатюру
+        после ее создания."""
+        group = Group.objects.create(slug='test-slug')
+        self.post.group = group
+        self.post.save()
+        url = reverse('posts:group_list', args=(group.slug,))
+        self.assertContains(Client().get(url), self.post.image.url)
+        thumbnails.generate_thumbnails(self.post.image.name, self.post.pk)
+        self.post.refresh_from_db()
+        self.assertContains(
+            Client().get(url),
+            f'src="{self.post.image_variant("card")["url"]}"')
+
+    def test_stored_variants_reset_cached_profiles(self):
+        """Закешированные профили показывают варианты после их записи,
+        и скопированные с другого поста тоже."""
+        url = reverse('posts:profile', args=(self.user.username,))
+        self.assertNotContains(Client().get(url), 'srcset=')
+        thumbnails.generate_thumbnails(self.post.image.name, self.post.pk)
+        self.assertContains(Client().get(url), 'srcset=')
+
+        other = User.objects.create_user(username='other')
+        copy = Post.objects.create(
+            author=other, text='Копия', image=self.post.image.name)
+        url = reverse('posts:profile', args=(other.username,))
+        self.assertNotContains(Client().get(url), 'srcset=')
+        with mock.patch.object(thumbnails, 'process_image') as process_image:
+            thumbnails.generate_thumbnails(copy.image.name, copy.pk)
+        process_image.assert_not_called()
+        self.assertContains(Client().get(url), 'srcset=')
+
+    def test_feed_reads_only_posts(self):
+        """Лента не читает файлы картинок и хранилище миниатюр."""
+        thumbnails.generate_thumbnails(self.post.image.name, self.post.pk)
+        Post.objects.create(
+            author=self.user, text='Пост', image=image_file('new.png'))
+        cache.clear()
+        with mock.patch.object(FileSystemStorage, 'open') as storage_open, \
+                mock.patch.object(default.kvstore, 'get') as kvstore_get:
+            response = Client().get(reverse('posts:index'))
+        storage_open.assert_not_called()
+        kvstore_get.assert_not_called()
+        self.assertContains(response, 'width="320" height="113"')
+        self.assertContains(response, 'srcset=')
+        self.assertContains(response, 'width="40" height="30"')
+        self.assertContains(response, 'loading="lazy"', count=2)
+
+    def test_backfill_command(self):
+        """generate_thumbnails заполняет посты без размеров и миниатюр."""
+        name = default_storage.save('posts/named.png', image_file('named'))
+        post = Post.objects.create(author=self.user, text='Имя', image=name)
+        Post.objects.create(
+            author=self.user, text='Нет файла', image='posts/missing.png')
+        self.assertIsNone(post.image_width)
+        out = StringIO()
+        with self.assertLogs(thumbnails.logger, 'ERROR'):
+            call_command('generate_thumbnails', stdout=out)
+        self.assertIn('3', out.getvalue())
+        post.refresh_from_db()
+        self.assertEqual((post.image_width, post.image_height), (40, 30))
+        self.assertEqual(
+            {key: post.image_variant('card')[key] for key in CARD}, CARD)
+        out = StringIO()
+        with mock.patch.object(thumbnails, 'process_image') as process_image, \
+                self.assertLogs(thumbnails.logger, 'ERROR'):
+            call_command('generate_thumbnails', stdout=out)
+        process_image.assert_called_once_with('posts/missing.png')
+        self.assertIn('1', out.getvalue())
+
+    def test_variants(self):
+        """Варианты в нескольких ширинах, без EXIF и с поворотом."""
+        exif = Image.Exif()
+        exif[EXIF_ORIENTATION] = 6
+        post = Post.objects.create(author=self.user, text='Фото', image=(
+            image_file('photo.jpg', size=(1500, 1200), image_format='jpeg',
+                       exif=exif)))
+        self.assertEqual((post.image_width, post.image_height), (1200, 1500))
+        thumbnails.generate_thumbnails(post.image.name, post.pk)
+        post.refresh_from_db()
+        self.assertEqual((post.image_width, post.image_height), (1200, 1500))
+        card = post.image_variant('card')
+        candidates = [
+            candidate.split() for candidate in card['srcset'].split(', ')]
+        self.assertEqual([width for url, width in candidates],
+                         ['320w', '640w', '960w'])
+        self.assertEqual(card['url'], candidates[-1][0])
+        for url, width in candidates:
+            with default_storage.open(media_path(url)) as file, \
+                    Image.open(file) as variant:
+                self.assertEqual(variant.format, 'JPEG')
+                self.assertEqual(f'{variant.width}w', width)
+                self.assertEqual(dict(variant.getexif()), {})
+        self.assertEqual(card['sources'] != [], features.check('webp'))
+        for source in card['sources']:
+            self.assertEqual(source['type'], 'image/webp')
+
+    @override_settings(POSTS_THUMBNAIL_WORKERS=1)
+    def test_background_worker(self):
+        """Миниатюры создаются в фоновом потоке, без повторов в очереди."""
+        done = threading.Event()
+        threads = []
+
+        def generate(name, post_pk):
+            threads.append(threading.current_thread().name)
+            done.set()
+
+        with mock.patch.object(thumbnails, 'generate_thumbnails', generate):
+            thumbnails.submit_thumbnails('posts/a.png', 1)
+            thumbnails.submit_thumbnails('posts/a.png', 1)
+            self.assertTrue(done.wait(5))
+        thumbnails._pending.clear()
+        self.assertEqual(len(threads), 1)
+        self.assertTrue(threads[0].startswith('thumbnails'))
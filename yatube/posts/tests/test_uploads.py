@@ -0,0 +1,124 @@
+'''
+[X] - картинка больше POSTS_IMAGE_MAX_BYTES отклоняется при чтении
+      запроса, форма показывает ошибку
+[X] - картинка больше POSTS_IMAGE_MAX_PIXELS отклоняется без декодирования
+[X] - файл не разрешенного формата отклоняется
+[X] - большой файл пишется во временный файл, а не в память
+[X] - заголовок ждется по кускам до POSTS_IMAGE_HEADER_BYTES
+[X] - принятая загрузка пишет в лог размер и память
+'''
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from ..models import Post, User
+from ..uploads import ImageUploadHandler, RejectedUpload
+from .utils import image_content, image_file
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POSTS_THUMBNAIL_WORKERS=0)
+class UploadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def create_post(self, content: bytes, name='image.png') -> list:
+        """Ошибки поля image при создании поста с файлом content."""
+        response = self.client.post(reverse('posts:post_create'), {
+            'text': 'Пост', 'image': image_file(name, content)})
+        if response.status_code == 302:
+            return []
+        return response.context['form'].errors['image']
+
+    @override_settings(POSTS_IMAGE_MAX_BYTES=1000)
+    def test_too_many_bytes(self):
+        """Файл больше лимита отклоняется, и пост не создается."""
+        self.assertEqual(
+            self.create_post(image_content((100, 100), noise=True)),
+            ['Файл больше 1000\xa0байт.'])
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(POSTS_IMAGE_MAX_PIXELS=1000)
+    def test_too_many_pixels(self):
+        """Картинка больше лимита пикселей не декодируется."""
+        content = image_content((40, 30), noise=True)
+        with mock.patch.object(Image.Image, 'load') as load:
+            errors = self.create_post(content)
+        load.assert_not_called()
+        self.assertEqual(errors, ['Картинка больше 1000 пикселей.'])
+        content = image_content((30, 30), noise=True)
+        self.assertEqual(self.create_post(content), [])
+
+    def test_unsupported_format(self):
+        """Картинка не разрешенного формата и не картинка отклоняются."""
+        for content in (image_content(image_format='bmp', noise=True),
+                        b'not an image'):
+            with self.subTest(content=content[:2]):
+                errors = self.create_post(content)
+                self.assertEqual(len(errors), 1)
+                self.assertIn('Загрузите правильное изображение', errors[0])
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=1000)
+    def test_large_upload_spools_to_disk(self):
+        """Файл больше FILE_UPLOAD_MAX_MEMORY_SIZE пишется на диск."""
+        request = RequestFactory().post('/', {
+            'image': image_file(size=(100, 100), noise=True)})
+        with self.assertLogs('posts.uploads', 'INFO') as logs:
+            image = request.FILES['image']
+        self.assertIsInstance(image, TemporaryUploadedFile)
+        self.assertIn('во временном файле', logs.output[0])
+
+    def test_accepted_upload_reports_memory(self):
+        """Принятая загрузка пишет в лог размер и память."""
+        content = image_content(noise=True)
+        request = RequestFactory().post(
+            '/', {'image': image_file(content=content)})
+        with self.assertLogs('posts.uploads', 'INFO') as logs:
+            request.FILES['image']
+        self.assertIn(f'{len(content)} байт, в памяти', logs.output[0])
+        self.assertIn(f'в памяти до {2 * len(content)} байт', logs.output[0])
+
+    def receive(self, content: bytes, chunk_size: int):
+        """Передает content обработчику кусками по chunk_size."""
+        handler = ImageUploadHandler()
+        handler.new_file('image', 'image.png', 'image/png', len(content))
+        forwarded = []
+        for start in range(0, len(content), chunk_size):
+            forwarded.append(handler.receive_data_chunk(
+                content[start:start + chunk_size], start))
+        with self.assertLogs('posts.uploads', 'INFO'):
+            return forwarded, handler.file_complete(len(content))
+
+    def test_header_across_chunks(self):
+        """Заголовок собирается из нескольких кусков."""
+        content = image_content((100, 100), noise=True)
+        forwarded, file = self.receive(content, 10)
+        self.assertIsNone(file)
+        self.assertEqual(b''.join(forwarded), content)
+
+    @override_settings(POSTS_IMAGE_HEADER_BYTES=100)
+    def test_header_limit(self):
+        """Без заголовка в начале файла остаток не передается дальше."""
+        forwarded, file = self.receive(b'x' * 1000, 10)
+        self.assertIsInstance(file, RejectedUpload)
+        self.assertEqual(forwarded[:9], [b'x' * 10] * 9)
+        self.assertEqual(set(forwarded[10:]), {None})
@@ -0,0 +1,108 @@
+'''
+[X] - окно номеров страниц содержит края и соседей текущей страницы
+[X] - длина окна не зависит от количества страниц
+[X] - паджинатор в шаблоне выводит окно, а не все страницы
+[X] - курсор листает по заданным полям, другая сортировка
+      QuerySet дает ValueError
+'''
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.paginator import Paginator
+from django.db.models import F
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Post, User
+from ..utils import CursorPaginator, decode_cursor, page_window
+from ..views import COUNT_POST_ON_PAGE
+
+
+class PageWindowTests(TestCase):
+    def test_page_window_values(self):
+        """Окно содержит края, соседей и пропуски."""
+        paginator = Paginator(range(1000), 10)
+        data = {
+            1: [1, 2, 3, None, 100],
+            5: [1, 2, 3, 4, 5, 6, 7, None, 100],
+            50: [1, None, 48, 49, 50, 51, 52, None, 100],
+            100: [1, None, 98, 99, 100],
+        }
+        for number, expected in data.items():
+            with self.subTest(number=number):
+                self.assertEqual(
+                    page_window(paginator.page(number)), expected)
+
+    def test_page_window_short_feed(self):
+        """Короткая лента выводится целиком."""
+        paginator = Paginator(range(50), 10)
+        self.assertEqual(page_window(paginator.page(3)), [1, 2, 3, 4, 5])
+
+    def test_page_window_size_is_constant(self):
+        """Длина окна не растет вместе с лентой."""
+        for count in (10 ** 3, 10 ** 5, 10 ** 7):
+            with self.subTest(count=count):
+                paginator = Paginator(range(count), 10)
+                page = paginator.page(paginator.num_pages // 2)
+                self.assertEqual(len(page_window(page)), 9)
+
+
+class PaginatorTemplateTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='auth')
+        Post.objects.bulk_create([
+            Post(author=cls.user, text='Тестовый пост')
+            for _ in range(COUNT_POST_ON_PAGE * 30)
+        ])
+        # bulk_create не шлет сигналов: счетчики и кеш устарели.
+        call_command('rebuild_counters', stdout=StringIO())
+        cache.clear()
+
+    def test_paginator_renders_window(self):
+        """В шаблон попадают только страницы из окна."""
+        response = self.client.get(
+            reverse('posts:profile', kwargs={'username': self.user}),
+            {'page': 15})
+        content = response.content.decode()
+        for number in (1, 13, 14, 16, 17, 30):
+            with self.subTest(number=number):
+                self.assertIn(f'href="?page={number}"', content)
+        for number in (2, 12, 18, 29):
+            with self.subTest(number=number):
+                self.assertNotIn(f'href="?page={number}"', content)
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='auth')
+        Post.objects.bulk_create([
+            Post(author=cls.user, text=f'Пост {number}')
+            for number in range(3)
+        ])
+
+    def test_explicit_fields(self):
+        """Курсор строится по заданным полям."""
+        posts = Post.objects.annotate(
+            feed_date=F('pub_date'), feed_pk=F('pk') * 10).order_by(
+                '-feed_date', '-feed_pk')
+        page = CursorPaginator(
+            posts, 2, ('feed_date', 'feed_pk')).get_page(None)
+        last = page.object_list[-1]
+        self.assertEqual(page.paginator.fields, ('feed_date', 'feed_pk'))
+        self.assertEqual(decode_cursor(page.next_cursor)[2], last.pk * 10)
+
+    def test_unsupported_ordering(self):
+        """Сортировка не по полям курсора дает ValueError."""
+        for posts, ordering in (
+                (Post.objects.order_by('text'), ('pub_date', 'pk')),
+                (Post.objects.order_by('-pub_date'), ('pub_date', 'pk')),
+                (Post.objects.order_by('-pub_date', '-pk'),
+                 ('feed_date', 'feed_pk')),
+                (Post.objects.all(), ('pub_date',))):
+            with self.subTest(ordering=posts.query.order_by):
+                with self.assertRaises(ValueError):
+                    CursorPaginator(posts, 2, ordering)
@@ -22,7 +22,17 @@
 [X] - в форму комментариев попадает правильный контекст
 [X] - в комментарии попадает правильный контекст
 
-[X] - после загрузки '/' в кеше хранятся данные до удаления
+[X] - после загрузки '/' в кеше хранятся данные до их изменения,
+      каждая страница кешируется отдельно
+[X] - гостю страницы отдаются из кеша до изменения их данных,
+      профили авторов группы сбрасываются вместе с ней
+[X] - неизменившиеся страницы отвечают 304 по ETag и Last-Modified,
+      Last-Modified меняет и правка в ту же секунду, пользователю
+      он не отдается
+[X] - курсорный паджинатор листает ленты вперед и назад
+      без пропусков и дублей
+[X] - количество постов в лентах берется из кеша
+      и обновляется при создании и удалении поста
 
 [Х} - follow_index - шаблон
 [Х} - follow_index, profile_unfollow, profile_follow точный редирект
@@ -33,18 +43,38 @@
 [х] - нет дубль подписки
 [х] - нет удаления пустой подписки
 [х] - нет самоподписки
+
+[X] - новый пост раскладывается в ленты подписчиков
+[X] - подписка дополняет ленту, отписка очищает ее
+[X] - кешированный фрагмент ленты подписок сбрасывается
+      подпиской и отпиской
+[X] - посты популярных авторов подмешиваются в ленту при чтении,
+      автор ниже порога снова раскладывается командой push_authors
+[X] - слияние потоков авторов дает ту же ленту, что и разложенная,
+      потоки всех авторов читаются общими запросами
+[X] - число запросов каждой страницы постоянно
+      и не зависит от количества постов на ней
 '''
+import math
 import shutil
 import tempfile
+import time
+from io import StringIO
+from http import HTTPStatus
+from unittest import mock
 
 from django import forms
 from django.conf import settings
 from django.core.cache import cache
+from django.core.management import call_command
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils.http import http_date
 
-from ..models import Comment, Follow, Group, Post, User
+from ..models import Comment, Follow, Group, Post, Timeline, User
 from ..views import COUNT_POST_ON_PAGE
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -365,6 +395,9 @@ class PaginatorViewsTest(TestCase):
             ) for _ in range(COUNT_POST_ON_PAGE + COUNT_POST_ON_TWO_PAGE)
         ]
         Post.objects.bulk_create(posts)
+        # bulk_create не шлет сигналов: счетчики и кеш устарели.
+        call_command('rebuild_counters', stdout=StringIO())
+        cache.clear()
 
     def test_pages_count_paginator_records(self):
         """Пагинатор выводит правильное количество записей на странице."""
@@ -386,6 +419,124 @@ class PaginatorViewsTest(TestCase):
                         response.context['page_obj']), post_count)
 
 
+class CursorPaginatorViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='auth')
+        cls.group = Group.objects.create(slug='test-slug')
+        posts = [
+            Post(
+                author=cls.user,
+                text=f'Тестовый пост {i}',
+                group=cls.group,
+            ) for i in range(COUNT_POST_ON_PAGE * 2 + COUNT_POST_ON_TWO_PAGE)
+        ]
+        Post.objects.bulk_create(posts)
+        cls.expected = list(
+            Post.objects.order_by('-pub_date', '-pk').values_list(
+                'pk', flat=True))
+
+    def walk_pages(self, url: str) -> list:
+        """Проходит ленту по курсорам до конца и обратно."""
+        forward, backward = [], []
+        response = self.client.get(url, {'cursor': ''})
+        page = response.context['page_obj']
+        self.assertFalse(page.has_previous())
+        forward.append([post.pk for post in page])
+        while page.has_next():
+            response = self.client.get(url, {'cursor': page.next_cursor})
+            page = response.context['page_obj']
+            forward.append([post.pk for post in page])
+        while page.has_previous():
+            response = self.client.get(url,
+                                       {'cursor': page.previous_cursor})
+            page = response.context['page_obj']
+            backward.insert(0, [post.pk for post in page])
+        return forward, backward
+
+    def test_cursor_pages_cover_feed(self):
+        """Курсорные страницы покрывают ленту без пропусков."""
+        page_for_test = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+        ]
+        for url in page_for_test:
+            with self.subTest(url=url):
+                forward, backward = self.walk_pages(url)
+                self.assertEqual(
+                    [len(page) for page in forward],
+                    [COUNT_POST_ON_PAGE, COUNT_POST_ON_PAGE,
+                     COUNT_POST_ON_TWO_PAGE])
+                self.assertEqual(sum(forward, []), self.expected)
+                self.assertEqual(backward, forward[:-1])
+
+    def test_follow_feed_cursor_pages(self):
+        """Лента подписок листается курсором по разложенной ленте."""
+        follower = User.objects.create(username='follower')
+        Follow.objects.create(user=follower, author=self.user)
+        self.client.force_login(follower)
+        forward, backward = self.walk_pages(reverse('posts:follow_index'))
+        self.assertEqual(sum(forward, []), self.expected)
+        self.assertEqual(backward, forward[:-1])
+
+    def test_broken_cursor_returns_first_page(self):
+        """Битый курсор отдает первую страницу."""
+        response = self.client.get(reverse('posts:index'),
+                                   {'cursor': 'not-a-cursor'})
+        self.assertEqual(
+            [post.pk for post in response.context['page_obj']],
+            self.expected[:COUNT_POST_ON_PAGE])
+
+
+class PostCountCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='auth')
+        cls.follower = User.objects.create(username='follower')
+        cls.group = Group.objects.create(slug='test-slug')
+        Follow.objects.create(user=cls.follower, author=cls.user)
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.follower_client = Client()
+        self.follower_client.force_login(PostCountCacheTests.follower)
+        self.urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+            reverse('posts:follow_index'),
+        ]
+
+    def page_counts(self) -> list:
+        return [
+            self.follower_client.get(url).context['page_obj'].paginator.count
+            for url in self.urls
+        ]
+
+    def test_count_is_cached(self):
+        """Повторный показ ленты не считает посты заново."""
+        Post.objects.create(author=self.user, group=self.group)
+        self.page_counts()
+        with CaptureQueriesContext(connection) as queries:
+            self.page_counts()
+        self.assertFalse([
+            query for query in queries
+            if 'COUNT(' in query['sql']
+            and 'FROM "posts_post"' in query['sql']
+        ])
+
+    def test_count_refreshed_on_create_and_delete(self):
+        """Количество обновляется при создании и удалении поста."""
+        self.assertEqual(self.page_counts(), [0, 0, 0, 0])
+        post = Post.objects.create(author=self.user, group=self.group)
+        self.assertEqual(self.page_counts(), [1, 1, 1, 1])
+        post.delete()
+        self.assertEqual(self.page_counts(), [0, 0, 0, 0])
+
+
 class PostCacheTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -400,13 +551,191 @@ class PostCacheTests(TestCase):
         """Контент index page попадает в кеш."""
         response = self.guest_client.get(reverse('posts:index'))
         test_cache = response.content
-        self.post.delete()
+        # update() не шлет сигналов, поэтому версия лент не меняется.
+        Post.objects.filter(pk=self.post.pk).update(text='Новый текст')
         response = self.guest_client.get(reverse('posts:index'))
         self.assertEqual(test_cache, response.content)
         cache.clear()
         response = self.guest_client.get(reverse('posts:index'))
         self.assertNotEqual(test_cache, response.content)
 
+    def test_cache_index_page_refreshed_on_delete(self) -> None:
+        """Удаление поста сразу сбрасывает кеш index page."""
+        response = self.guest_client.get(reverse('posts:index'))
+        test_cache = response.content
+        self.post.delete()
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertNotEqual(test_cache, response.content)
+
+    def test_cache_index_pages_differ(self) -> None:
+        """Разные страницы index page кешируются отдельно."""
+        Post.objects.bulk_create([
+            Post(author=self.user, text=f'Пост {i}')
+            for i in range(COUNT_POST_ON_PAGE)
+        ])
+        cache.clear()
+        first = self.guest_client.get(reverse('posts:index'), {'page': 1})
+        second = self.guest_client.get(reverse('posts:index'), {'page': 2})
+        self.assertNotEqual(first.content, second.content)
+
+
+class AnonymousPageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(slug='test-slug', title='Группа')
+        cls.post = Post.objects.create(
+            author=cls.user, group=cls.group, text='Тестовый пост')
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(AnonymousPageCacheTests.user)
+        self.urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        ]
+
+    def contents(self, client) -> list:
+        return [client.get(url).content for url in self.urls]
+
+    def test_guest_pages_cached(self):
+        """Гость получает страницы из кеша, пока данные не менялись."""
+        cached = self.contents(self.guest_client)
+        # update() не шлет сигналов, поэтому теги не сбрасываются.
+        Post.objects.filter(pk=self.post.pk).update(text='Новый текст')
+        self.assertEqual(self.contents(self.guest_client), cached)
+        self.assertNotEqual(self.contents(self.authorized_client), cached)
+
+    def test_guest_pages_invalidated_by_tags(self):
+        """Правка поста, группы и комментарий сбрасывают свои страницы."""
+        cached = self.contents(self.guest_client)
+        self.post.text = 'Новый текст'
+        self.post.save()
+        self.assertEqual(
+            [new == old for new, old in zip(
+                self.contents(self.guest_client), cached)],
+            [False, False, False, False])
+
+        cached = self.contents(self.guest_client)
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Комментарий')
+        self.assertEqual(
+            [new == old for new, old in zip(
+                self.contents(self.guest_client), cached)],
+            [True, True, True, False])
+
+        cached = self.contents(self.guest_client)
+        self.group.title = 'Новая группа'
+        self.group.save()
+        self.assertEqual(
+            [new == old for new, old in zip(
+                self.contents(self.guest_client), cached)],
+            [True, False, True, False])
+
+    def test_guest_profile_invalidated_by_group(self):
+        """Смена адреса и удаление группы сбрасывают профили ее авторов."""
+        url = reverse('posts:profile', kwargs={'username': self.user})
+        self.assertContains(self.guest_client.get(url), '/group/test-slug/')
+        self.group.slug = 'new-slug'
+        self.group.save()
+        self.assertContains(self.guest_client.get(url), '/group/new-slug/')
+        self.group.delete()
+        self.assertNotContains(self.guest_client.get(url), '/group/')
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(slug='test-slug')
+        cls.post = Post.objects.create(
+            author=cls.user, group=cls.group, text='Тестовый пост')
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        ]
+
+    def test_not_modified(self):
+        """Повторный запрос неизменившейся страницы получает 304."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                with self.assertNumQueries(1):
+                    response = self.client.get(
+                        url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(response.status_code,
+                                 HTTPStatus.NOT_MODIFIED)
+
+    def test_last_modified(self):
+        """Last-Modified отдается гостю, когда его секунда прошла,
+        и меняется от правки в ту же секунду."""
+        second = math.floor(time.time()) + 10
+        clock = mock.patch('core.cache.time.time')
+        with clock as now:
+            for url in self.urls:
+                with self.subTest(url=url):
+                    cache.clear()
+                    now.return_value = second + 0.2
+                    response = self.client.get(url)
+                    self.assertNotIn('Last-Modified', response)
+                    now.return_value = second + 0.5
+                    self.post.save()
+                    now.return_value = second + 0.6
+                    response = self.client.get(
+                        url, HTTP_IF_MODIFIED_SINCE=http_date(second))
+                    self.assertEqual(response.status_code, HTTPStatus.OK)
+                    now.return_value = second + 2
+                    response = self.client.get(url)
+                    self.assertEqual(response['Last-Modified'],
+                                     http_date(second + 1))
+                    response = self.client.get(
+                        url, HTTP_IF_MODIFIED_SINCE=http_date(second + 1))
+                    self.assertEqual(response.status_code,
+                                     HTTPStatus.NOT_MODIFIED)
+
+    def test_no_last_modified_for_user(self):
+        """Страницы пользователя проверяются только по ETag."""
+        client = Client()
+        client.force_login(self.user)
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = client.get(url)
+                self.assertNotIn('Last-Modified', response)
+                response = client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60))
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_modified_after_change(self):
+        """После правки поста страницы отдаются заново."""
+        etags = [self.client.get(url)['ETag'] for url in self.urls]
+        self.post.text = 'Новый текст'
+        self.post.save()
+        for url, etag in zip(self.urls, etags):
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_etag_depends_on_user(self):
+        """Гость и пользователь получают разные ETag."""
+        client = Client()
+        client.force_login(self.user)
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertNotEqual(self.client.get(url)['ETag'],
+                                    client.get(url)['ETag'])
+
 
 class FollowDBTests(TestCase):
     @classmethod
@@ -487,3 +816,209 @@ class FollowDBTests(TestCase):
                 user=self.user,
                 author=self.author).exists())
         self.assertEqual(Follow.objects.count(), follow_count)
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.author = User.objects.create(username='author')
+        cls.old_post = Post.objects.create(author=cls.author)
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(TimelineTests.user)
+
+    def feed(self) -> list:
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_follow_and_unfollow_update_timeline(self):
+        """Подписка дополняет ленту, отписка очищает ее."""
+        self.authorized_client.get(
+            reverse('posts:profile_follow',
+                    kwargs={'username': self.author}))
+        self.assertEqual(self.feed(), [self.old_post])
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow',
+                    kwargs={'username': self.author}))
+        self.assertFalse(Timeline.objects.filter(user=self.user).exists())
+        self.assertEqual(self.feed(), [])
+
+    def test_follow_and_unfollow_refresh_cached_feed(self):
+        """Подписка и отписка сбрасывают кешированный фрагмент ленты."""
+        Post.objects.filter(pk=self.old_post.pk).update(text='Старый пост')
+        url = reverse('posts:follow_index')
+        self.assertNotContains(self.authorized_client.get(url), 'Старый пост')
+        self.authorized_client.get(
+            reverse('posts:profile_follow',
+                    kwargs={'username': self.author}))
+        self.assertContains(self.authorized_client.get(url), 'Старый пост')
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow',
+                    kwargs={'username': self.author}))
+        self.assertNotContains(self.authorized_client.get(url), 'Старый пост')
+
+    @override_settings(POSTS_FANOUT_FOLLOWER_LIMIT=0)
+    def test_popular_author_pulled_on_read(self):
+        """Посты популярного автора не раскладываются, а читаются напрямую."""
+        Follow.objects.create(user=self.user, author=self.author)
+        new_post = Post.objects.create(author=self.author)
+        self.assertFalse(Timeline.objects.filter(user=self.user).exists())
+        self.assertEqual(self.feed(), [new_post, self.old_post])
+
+    def test_author_pulled_after_fan_out(self):
+        """Посты автора, ставшего популярным, не дублируются в ленте,
+        ее страница читается фиксированным числом запросов."""
+        Follow.objects.create(user=self.user, author=self.author)
+        with override_settings(POSTS_FANOUT_FOLLOWER_LIMIT=1):
+            follower = User.objects.create(username='follower')
+            Follow.objects.create(user=follower, author=self.author)
+            new_post = Post.objects.create(author=self.author)
+            cache.clear()
+            # Сессия, пользователь, авторы при чтении, их потоки,
+            # разложенная лента, посты и количество.
+            with self.assertNumQueries(7):
+                self.assertEqual(self.feed(), [new_post, self.old_post])
+
+    def test_author_below_limit_back_to_push(self):
+        """Автор, опустившийся до порога, читается напрямую, пока
+        push_authors не разложит его посты по лентам."""
+        Follow.objects.create(user=self.user, author=self.author)
+        with override_settings(POSTS_FANOUT_FOLLOWER_LIMIT=1):
+            follower = User.objects.create(username='follower')
+            Follow.objects.create(user=follower, author=self.author)
+            new_post = Post.objects.create(author=self.author)
+            Follow.objects.filter(user=follower).delete()
+            self.assertFalse(Timeline.objects.filter(
+                user=self.user, post=new_post).exists())
+            self.assertEqual(self.feed(), [new_post, self.old_post])
+            out = StringIO()
+            call_command('push_authors', stdout=out)
+            self.assertIn('Авторов снова в лентах: 1.', out.getvalue())
+            self.assertTrue(Timeline.objects.filter(
+                user=self.user, post=new_post).exists())
+            self.assertEqual(self.feed(), [new_post, self.old_post])
+            newest_post = Post.objects.create(author=self.author)
+            self.assertTrue(Timeline.objects.filter(
+                user=self.user, post=newest_post).exists())
+
+    def test_new_post_fan_out(self):
+        """Новый пост попадает в ленту подписчика первым."""
+        Follow.objects.create(user=self.user, author=self.author)
+        new_post = Post.objects.create(author=self.author)
+        self.assertTrue(
+            Timeline.objects.filter(user=self.user, post=new_post).exists())
+        self.assertEqual(self.feed(), [new_post, self.old_post])
+
+
+class MergedFeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.authors = [
+            User.objects.create(username=f'author{i}') for i in range(3)
+        ]
+        for author in cls.authors:
+            Follow.objects.create(user=cls.user, author=author)
+        for i in range(COUNT_POST_ON_PAGE * 2):
+            Post.objects.create(author=cls.authors[i % 3], text=str(i))
+        Post.objects.create(author=User.objects.create(username='stranger'))
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(MergedFeedTests.user)
+
+    def feed_pages(self) -> list:
+        return [
+            list(self.authorized_client.get(
+                reverse('posts:follow_index'),
+                {'page': page}).context['page_obj'])
+            for page in (1, 2)
+        ]
+
+    def test_merged_feed_matches_timeline(self):
+        """Слияние потоков авторов дает ту же ленту, что и разложенная."""
+        expected = self.feed_pages()
+        with override_settings(POSTS_FOLLOW_FEED_ENGINE='merge',
+                               POSTS_MERGE_BATCH_SIZE=3):
+            self.assertEqual(self.feed_pages(), expected)
+        self.assertEqual(
+            [len(page) for page in expected],
+            [COUNT_POST_ON_PAGE, COUNT_POST_ON_PAGE])
+        self.assertNotEqual(expected[0], expected[1])
+
+
+class FeedQueryCountTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.author = User.objects.create_user(username='author')
+        Follow.objects.create(user=cls.user, author=cls.author)
+        cls.group = Group.objects.create(slug='test-slug')
+        for i in range(COUNT_POST_ON_PAGE + 1):
+            commentator = User.objects.create(username=f'reader{i}')
+            cls.post = Post.objects.create(
+                author=cls.author, group=Group.objects.create(slug=str(i)),
+                text=f'Тестовый пост {i}')
+            Comment.objects.create(post=cls.post, author=commentator)
+            Comment.objects.create(post=cls.post, author=cls.user)
+        cls.post.group = cls.group
+        cls.post.save()
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(FeedQueryCountTests.user)
+
+    def assertPageQueries(self, client, url: str, num: int):
+        cache.clear()
+        with self.subTest(url=url), self.assertNumQueries(num):
+            response = client.get(url)
+            self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_pages_query_count(self):
+        """Страницы постов выполняют фиксированное число запросов."""
+        # Для авторизованного добавляются сессия и пользователь,
+        # в профиле еще проверка подписки.
+        page_for_test = {
+            reverse('posts:index'): 3,
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}): 4,
+            reverse('posts:profile', kwargs={'username': 'author'}): 3,
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}): 3,
+        }
+        for url, num in page_for_test.items():
+            self.assertPageQueries(self.client, url, num)
+        page_for_test[reverse('posts:profile',
+                              kwargs={'username': 'author'})] += 1
+        for url, num in page_for_test.items():
+            self.assertPageQueries(self.authorized_client, url, num + 2)
+
+    def test_follow_index_query_count(self):
+        """Лента подписок выполняет фиксированное число запросов."""
+        url = reverse('posts:follow_index')
+        self.assertPageQueries(self.authorized_client, url, 5)
+        with override_settings(POSTS_FOLLOW_FEED_ENGINE='merge'):
+            # Плюс список подписок, потоки всех авторов одним запросом.
+            self.assertPageQueries(self.authorized_client, url, 6)
+            for i in range(3):
+                author = User.objects.create(username=f'merged{i}')
+                Post.objects.create(author=author, text='Тестовый пост')
+                Follow.objects.create(user=self.user, author=author)
+            self.assertPageQueries(self.authorized_client, url, 6)
+
+    def test_query_count_does_not_grow_with_page(self):
+        """Число запросов не растет вместе с числом постов на странице."""
+        url = reverse('posts:index')
+        with CaptureQueriesContext(connection) as full_page:
+            self.client.get(url)
+        Post.objects.exclude(pk=self.post.pk).delete()
+        cache.clear()
+        with CaptureQueriesContext(connection) as one_post:
+            self.client.get(url)
+        self.assertEqual(len(full_page), len(one_post))
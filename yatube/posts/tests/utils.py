@@ -0,0 +1,30 @@
+import os
+from io import BytesIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+
+
+def image_content(size=(40, 30), image_format='png', color='red',
+                  noise=False, **params) -> bytes:
+    """Картинка для тестов загрузки и миниатюр.
+
+    Картинка из шума (noise) почти не сжимается, ее размер в байтах
+    растет вместе с размером в пикселях.
+    """
+    if noise:
+        image = Image.frombytes('L', size, os.urandom(size[0] * size[1]))
+    else:
+        image = Image.new('RGB', size, color)
+    file = BytesIO()
+    image.save(file, image_format, **params)
+    return file.getvalue()
+
+
+def image_file(name='image.png', content=None,
+               **params) -> SimpleUploadedFile:
+    """Загружаемый файл с content или картинкой image_content(**params)."""
+    if content is None:
+        content = image_content(**params)
+    return SimpleUploadedFile(
+        name, content, f'image/{params.get("image_format", "png")}')
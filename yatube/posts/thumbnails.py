@@ -0,0 +1,89 @@
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from django.conf import settings
+from django.db import connections, transaction
+
+from core.cache import invalidate_tags
+
+from .images import process_image
+from .models import Post
+from .utils import FEED_TAG, author_tag, group_tag, post_tag
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = Lock()
+_pending = set()
+
+
+def generate_thumbnails(name: str, post_pk: int, force: bool = False) -> None:
+    """Создает все варианты IMAGE_PRESETS для картинки name
+    и записывает их адреса и размеры вместе с размерами картинки
+    во все посты с этой картинкой.
+
+    Одинаковые загрузки делят файл, поэтому готовые миниатюры другого
+    поста копируются без обработки, если не задан force.
+    update() не шлет сигналов, поэтому закешированные страницы постов,
+    их авторов и групп, которые показывают саму картинку, после
+    создания миниатюр сбрасываются здесь.
+    """
+    try:
+        posts = Post.objects.filter(image=name)
+        ready = None if force else posts.exclude(
+            image_thumbnails='').exclude(image_width=None).values_list(
+            'image_width', 'image_height', 'image_thumbnails').first()
+        if ready is None:
+            (width, height), variants = process_image(name)
+            ready = width, height, json.dumps(variants)
+        else:
+            posts = posts.filter(pk=post_pk)
+        updated = list(posts.values_list('pk', 'author_id', 'group_id'))
+        posts.update(image_width=ready[0], image_height=ready[1],
+                     image_thumbnails=ready[2])
+        invalidate_tags(FEED_TAG, *{
+            tag for pk, author_id, group_id in updated
+            for tag in (post_tag(pk), author_tag(author_id),
+                        group_tag(group_id))
+        })
+    except Exception:
+        logger.exception('Не удалось создать миниатюры %s', name)
+    finally:
+        with _executor_lock:
+            _pending.discard(name)
+        if settings.POSTS_THUMBNAIL_WORKERS:
+            connections.close_all()
+
+
+def executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.POSTS_THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails')
+        return _executor
+
+
+def submit_thumbnails(name: str, post_pk: int) -> None:
+    """Ставит картинку в очередь, если она еще не ждет обработки.
+
+    При POSTS_THUMBNAIL_WORKERS = 0 миниатюры создаются сразу.
+    """
+    with _executor_lock:
+        if name in _pending:
+            return
+        _pending.add(name)
+    if not settings.POSTS_THUMBNAIL_WORKERS:
+        generate_thumbnails(name, post_pk)
+        return
+    executor().submit(generate_thumbnails, name, post_pk)
+
+
+def queue_thumbnails(post) -> None:
+    """Создает миниатюры картинки поста в фоне после коммита."""
+    if post.image:
+        name, post_pk = post.image.name, post.pk
+        transaction.on_commit(lambda: submit_thumbnails(name, post_pk))
@@ -0,0 +1,122 @@
+import logging
+import warnings
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from django.template.defaultfilters import filesizeformat
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+INVALID_IMAGE = ('Загрузите правильное изображение. Файл, который вы '
+                 'загрузили, поврежден или не является изображением.')
+
+
+def too_large() -> ValidationError:
+    return ValidationError(
+        'Файл больше %(limit)s.', code='file_size',
+        params={'limit': filesizeformat(settings.POSTS_IMAGE_MAX_BYTES)})
+
+
+def check_image(file) -> str:
+    """Проверяет картинку по заголовку и возвращает ее MIME-тип.
+
+    Pillow читает только заголовок и только разрешенных форматов,
+    пиксели не декодируются. Картинка больше POSTS_IMAGE_MAX_PIXELS
+    отклоняется до того, как ее кто-нибудь откроет целиком.
+    """
+    position = file.tell()
+    file.seek(0)
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', Image.DecompressionBombWarning)
+            with Image.open(
+                    file, formats=settings.POSTS_IMAGE_FORMATS) as image:
+                image_format, (width, height) = image.format, image.size
+    except Image.DecompressionBombError:
+        width = height = None
+    except OSError:
+        raise ValidationError(INVALID_IMAGE, code='invalid_image')
+    finally:
+        file.seek(position)
+    if width is None or width * height > settings.POSTS_IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            'Картинка больше %(limit)s пикселей.', code='image_pixels',
+            params={'limit': settings.POSTS_IMAGE_MAX_PIXELS})
+    return Image.MIME[image_format]
+
+
+class RejectedUpload(UploadedFile):
+    """Файл, отклоненный при загрузке: данных нет, есть только ошибка."""
+
+    def __init__(self, name: str, error: ValidationError):
+        super().__init__(BytesIO(), name, size=0)
+        self.upload_error = error
+
+
+class ImageUploadHandler(FileUploadHandler):
+    """Проверяет загружаемые файлы по мере чтения запроса.
+
+    Стоит перед обработчиками Django и передает им данные дальше.
+    Заголовок картинки проверяется по первым POSTS_IMAGE_HEADER_BYTES,
+    размер - по каждому куску; после ошибки остаток файла
+    пропускается, а в форму попадает RejectedUpload.
+    """
+    in_memory = False
+
+    def handle_raw_input(self, input_data, META, content_length,
+                         boundary, encoding=None):
+        self.in_memory = (
+            content_length <= settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.header = bytearray()
+        self.header_size = 0
+        self.checked = False
+        self.error = None
+
+    def check_header(self, complete: bool) -> None:
+        try:
+            check_image(BytesIO(self.header))
+        except ValidationError as error:
+            if (error.code != 'invalid_image' or complete
+                    or len(self.header) >= settings.POSTS_IMAGE_HEADER_BYTES):
+                self.error = error
+            return
+        self.checked = True
+        self.header_size = len(self.header)
+        self.header = bytearray()
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.error is not None:
+            return None
+        if start + len(raw_data) > settings.POSTS_IMAGE_MAX_BYTES:
+            self.error = too_large()
+            return None
+        if not self.checked:
+            self.header += raw_data[
+                :settings.POSTS_IMAGE_HEADER_BYTES - len(self.header)]
+            self.check_header(complete=False)
+            if self.error is not None:
+                return None
+        return raw_data
+
+    def file_complete(self, file_size):
+        if self.error is None and not self.checked:
+            self.check_header(complete=True)
+        self.header = bytearray()
+        if self.error is not None:
+            logger.info('Загрузка %s отклонена: %s',
+                        self.file_name, self.error.messages[0])
+            return RejectedUpload(self.file_name, self.error)
+        buffered = file_size if self.in_memory else self.chunk_size
+        logger.info(
+            'Загрузка %s: %d байт, %s, в памяти до %d байт',
+            self.file_name, file_size,
+            'в памяти' if self.in_memory else 'во временном файле',
+            self.header_size + buffered)
+        return None
@@ -17,5 +17,6 @@ urlpatterns = [
          name='add_comment'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('create/', views.post_create, name='post_create'),
+    path('search/', views.search, name='search'),
     path('', views.index, name='index'),
 ]
@@ -1,8 +1,301 @@
+import base64
+import binascii
+from datetime import datetime
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
 from django.core.paginator import Paginator
+from django.db.models import Q, QuerySet
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+from core.cache import tag_versions
+
+CURSOR_PARAM: str = 'cursor'
+CURSOR_NEXT: str = 'n'
+CURSOR_PREVIOUS: str = 'p'
+COUNT_CACHE_KEY: str = 'posts:count:{}'
+FEED_TAG: str = 'posts'
+KEYSET_ORDERING: tuple = ('pub_date', 'pk')
+PAGE_WINDOW_ON_EACH_SIDE: int = 2
+PAGE_WINDOW_ON_ENDS: int = 1
+
+
+def count_cache_key(feed: str, pk=None) -> str:
+    """Ключ кеша количества постов в ленте."""
+    if pk is None:
+        return COUNT_CACHE_KEY.format(feed)
+    return COUNT_CACHE_KEY.format(f'{feed}:{pk}')
+
+
+def cached_count(post_list, key: str) -> int:
+    """Количество постов в ленте из кеша.
+
+    Небольшие количества хранятся без срока и сбрасываются
+    сигналами при создании и удалении постов, поэтому точны.
+    Количества от POSTS_COUNT_EXACT_LIMIT считаются приблизительными:
+    сигналы их не трогают, и они живут POSTS_COUNT_STALENESS секунд.
+    """
+    count = cache.get(key)
+    if count is None:
+        count = post_list.count()
+        if count < settings.POSTS_COUNT_EXACT_LIMIT:
+            cache.set(key, count, None)
+        else:
+            cache.set(key, count, settings.POSTS_COUNT_STALENESS)
+    return count
+
+
+def invalidate_counts(*keys: str) -> None:
+    """Сбрасывает точные количества, приблизительные доживают свой срок."""
+    stale = [
+        key for key, count in cache.get_many(keys).items()
+        if count < settings.POSTS_COUNT_EXACT_LIMIT
+    ]
+    cache.delete_many(stale)
+
+
+def cached_counter(post_list, key: str):
+    """Источник количества постов ленты для CachedCountPaginator."""
+    return partial(cached_count, post_list, key)
+
+
+class CachedCountPaginator(Paginator):
+    """Паджинатор, который берет общее количество у counter."""
+
+    def __init__(self, object_list, per_page, counter, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.counter = counter
+
+    @cached_property
+    def count(self) -> int:
+        return self.counter()
+
+
+def post_tag(pk) -> str:
+    return f'post:{pk}'
+
+
+def author_tag(pk) -> str:
+    return f'author:{pk}'
+
+
+def group_tag(pk) -> str:
+    return f'group:{pk}'
+
+
+def follow_tag(pk) -> str:
+    return f'follow:{pk}'
+
+
+def feed_version() -> float:
+    """Версия содержимого лент, меняется при каждой правке данных."""
+    return tag_versions([FEED_TAG])[FEED_TAG]
+
+
+def feed_cache(feed: str, page_obj, *parts, tags=()) -> dict:
+    """Контекст для кеширования фрагмента ленты в шаблоне.
+
+    Ключ включает тип ленты, ее владельца, номер страницы или курсор
+    и версии лент и тегов tags, поэтому устаревший фрагмент
+    не будет прочитан.
+    """
+    if getattr(page_obj.paginator, 'keyset', False):
+        position = page_obj.cursor
+    else:
+        position = page_obj.number
+    versions = tag_versions([FEED_TAG, *tags])
+    key_parts = [feed, *parts, position,
+                 *(versions[tag] for tag in (FEED_TAG, *tags))]
+    return {
+        'feed_cache_key': ':'.join(str(part) for part in key_parts),
+        'feed_cache_timeout': settings.POSTS_FEED_CACHE_TIMEOUT,
+    }
+
+
+def page_window(page, on_each_side: int = PAGE_WINDOW_ON_EACH_SIDE,
+                on_ends: int = PAGE_WINDOW_ON_ENDS) -> list:
+    """Номера страниц вокруг текущей и по краям ленты.
+
+    Пропуски обозначаются None, длина списка не зависит
+    от общего количества страниц. Пропуск в одну страницу
+    не сворачивается, вместо него выводится сама страница.
+    """
+    num_pages = page.paginator.num_pages
+    number = page.number
+    if num_pages <= (on_each_side + on_ends + 1) * 2 + 1:
+        return list(range(1, num_pages + 1))
+
+    window = []
+    if number > on_each_side + on_ends + 2:
+        window += list(range(1, on_ends + 1)) + [None]
+        window += list(range(number - on_each_side, number))
+    else:
+        window += list(range(1, number))
+    if number < num_pages - on_each_side - on_ends - 1:
+        window += list(range(number, number + on_each_side + 1)) + [None]
+        window += list(range(num_pages - on_ends + 1, num_pages + 1))
+    else:
+        window += list(range(number, num_pages + 1))
+    return window
+
+
+def encode_cursor(direction: str, pub_date: datetime, pk: int) -> str:
+    """Упаковывает позицию в ленте в непрозрачный токен."""
+    raw = f'{direction}|{pub_date.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token: str):
+    """Распаковывает токен. Для битого токена возвращает None."""
+    try:
+        raw = base64.urlsafe_b64decode(
+            token + '=' * (-len(token) % 4)).decode()
+        direction, pub_date, pk = raw.split('|')
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if direction not in (CURSOR_NEXT, CURSOR_PREVIOUS) or pub_date is None:
+        return None
+    return direction, pub_date, pk
+
+
+class CursorPage:
+    """Страница ленты, полученная по курсору.
+
+    Повторяет интерфейс Page, который используют шаблоны,
+    но вместо номеров страниц отдает токены соседних страниц.
+    """
+
+    def __init__(self, object_list, paginator, has_next: bool,
+                 has_previous: bool, cursor: str = ''):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.cursor = cursor
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self)} posts>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self) -> bool:
+        return self._has_next
+
+    def has_previous(self) -> bool:
+        return self._has_previous
+
+    def has_other_pages(self) -> bool:
+        return self._has_next or self._has_previous
+
+    def position(self, post) -> tuple:
+        date_field, pk_field = self.paginator.fields
+        return getattr(post, date_field), getattr(post, pk_field)
+
+    @property
+    def next_cursor(self):
+        if not self._has_next or not self.object_list:
+            return None
+        return encode_cursor(
+            CURSOR_NEXT, *self.position(self.object_list[-1]))
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous or not self.object_list:
+            return None
+        return encode_cursor(
+            CURSOR_PREVIOUS, *self.position(self.object_list[0]))
+
+
+class CursorPaginator:
+    """Keyset-паджинатор по паре полей ordering: дата и id.
+
+    Не считает общее количество записей и не использует OFFSET,
+    поэтому стоимость страницы не зависит от ее глубины.
+    Поля можно задать аннотациями с копиями даты и id из другой
+    таблицы, чтобы запрос шел по индексу этой таблицы. QuerySet
+    с другой явной сортировкой не принимается: ValueError.
+    """
+
+    keyset = True
+
+    def __init__(self, object_list, per_page: int,
+                 ordering: tuple = KEYSET_ORDERING):
+        if len(ordering) != 2:
+            raise ValueError(
+                f'Курсор строится по дате и id, а не по {ordering}.')
+        explicit = tuple(object_list.query.order_by)
+        if explicit and explicit not in (
+                tuple(ordering), tuple(f'-{field}' for field in ordering)):
+            raise ValueError(
+                f'Сортировка {explicit} не совпадает с полями курсора '
+                f'{ordering}.')
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.fields = tuple(ordering)
+
+    def after(self, pub_date, pk, lookup: str) -> Q:
+        date_field, pk_field = self.fields
+        return (Q(**{f'{date_field}__{lookup}': pub_date})
+                | Q(**{date_field: pub_date, f'{pk_field}__{lookup}': pk}))
+
+    def ordered(self, descending: bool = True):
+        prefix = '-' if descending else ''
+        return self.object_list.order_by(
+            *(prefix + field for field in self.fields))
+
+    def get_page(self, token):
+        """Возвращает страницу по токену, битый токен дает первую."""
+        cursor = decode_cursor(token) if token else None
+        if cursor is None:
+            rows = list(self.ordered()[:self.per_page + 1])
+            return CursorPage(rows[:self.per_page], self,
+                              has_next=len(rows) > self.per_page,
+                              has_previous=False)
+
+        direction, pub_date, pk = cursor
+        if direction == CURSOR_NEXT:
+            rows = list(self.ordered().filter(
+                self.after(pub_date, pk, 'lt'))[:self.per_page + 1])
+            return CursorPage(rows[:self.per_page], self,
+                              has_next=len(rows) > self.per_page,
+                              has_previous=True, cursor=token)
+
+        rows = list(self.ordered(descending=False).filter(
+            self.after(pub_date, pk, 'gt'))[:self.per_page + 1])
+        return CursorPage(rows[:self.per_page][::-1], self,
+                          has_next=True,
+                          has_previous=len(rows) > self.per_page,
+                          cursor=token)
+
 
+def post_obj(request, post_list, count: int, counter=None,
+             ordering: tuple = KEYSET_ORDERING):
+    """Расчитывает паджинатор.
 
-def post_obj(request, post_list, count: int):
-    """Расчитывает паджинатор"""
-    paginator = Paginator(post_list, count)
+    Если в запросе есть параметр cursor или включена настройка
+    POSTS_KEYSET_PAGINATION, лента из QuerySet листается по курсору
+    по полям ordering (см. CursorPaginator).
+    С counter общее количество постов берется у него, а не из COUNT(*).
+    """
+    keyset = (CURSOR_PARAM in request.GET
+              or getattr(settings, 'POSTS_KEYSET_PAGINATION', False))
+    if keyset and isinstance(post_list, QuerySet):
+        paginator = CursorPaginator(post_list, count, ordering)
+        return paginator.get_page(request.GET.get(CURSOR_PARAM))
+    if counter is None:
+        paginator = Paginator(post_list, count)
+    else:
+        paginator = CachedCountPaginator(post_list, count, counter)
     page_number = request.GET.get('page')
     return paginator.get_page(page_number)
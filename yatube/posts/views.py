@@ -1,65 +1,169 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.db.models import Max, OuterRef, Subquery
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.http import urlencode
 
+from core.cache import anonymous_cache_page, conditional_page, tag_response
+from core.middleware import query_budget
+
+from .counters import user_stats
+from .feeds import (TIMELINE_ORDERING, MergedFeed, follow_counter,
+                    hydrate_posts, timeline_posts)
 from .forms import CommentForm, PostForm
 from .models import Follow, Group, Post, User
-from .utils import post_obj
+from .search import SearchResults
+from .thumbnails import queue_thumbnails
+from .utils import (FEED_TAG, author_tag, cached_counter, count_cache_key,
+                    feed_cache, follow_tag, group_tag, post_obj, post_tag)
 
 COUNT_POST_ON_PAGE: int = 10
 
 
+def index_validator():
+    last = Post.objects.aggregate(last=Max('pub_date'))['last']
+    return [FEED_TAG], last
+
+
+def last_pub_date(**lookups):
+    """Подзапрос даты последнего поста, идет по индексу без сортировки."""
+    return Subquery(Post.objects.filter(**lookups).order_by(
+        '-pub_date').values('pub_date')[:1])
+
+
+def group_validator(slug):
+    group = Group.objects.filter(slug=slug).annotate(
+        last=last_pub_date(group=OuterRef('pk'))).values_list(
+        'pk', 'last').first()
+    if group is None:
+        return None
+    return [group_tag(group[0])], group[1]
+
+
+def profile_validator(username):
+    author = User.objects.filter(username=username).annotate(
+        last=last_pub_date(author=OuterRef('pk'))).values_list(
+        'pk', 'last').first()
+    if author is None:
+        return None
+    return [author_tag(author[0])], author[1]
+
+
+def post_detail_validator(post_id):
+    post = Post.objects.filter(pk=post_id).values_list(
+        'author_id', 'group_id', 'pub_date').first()
+    if post is None:
+        return None
+    author_id, group_id, pub_date = post
+    return [post_tag(post_id), author_tag(author_id),
+            group_tag(group_id)], pub_date
+
+
+@query_budget(8)
+@conditional_page(index_validator)
+@anonymous_cache_page
 def index(request):
     """Главная страница."""
-    post_list = Post.objects.select_related('group', 'author')
+    post_list = hydrate_posts(Post.objects)
+    page_obj = post_obj(request, post_list, COUNT_POST_ON_PAGE,
+                        cached_counter(post_list, count_cache_key('index')))
     context = {
-        'page_obj': post_obj(request, post_list, COUNT_POST_ON_PAGE),
+        'page_obj': page_obj,
+        **feed_cache('index', page_obj),
     }
-    return render(request, 'posts/index.html', context)
+    response = render(request, 'posts/index.html', context)
+    return tag_response(response, FEED_TAG)
 
 
+@query_budget(8)
+@conditional_page(group_validator)
+@anonymous_cache_page
 def group_posts(request, slug):
     """Посты группы."""
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.select_related('group', 'author')
+    post_list = hydrate_posts(group.posts)
+    page_obj = post_obj(
+        request, post_list, COUNT_POST_ON_PAGE,
+        cached_counter(post_list, count_cache_key('group', group.pk)))
     context = {
         'group': group,
-        'page_obj': post_obj(request, post_list, COUNT_POST_ON_PAGE),
+        'page_obj': page_obj,
+        **feed_cache('group', page_obj, group.pk),
     }
-    return render(request, 'posts/group_list.html', context)
+    response = render(request, 'posts/group_list.html', context)
+    return tag_response(response, group_tag(group.pk))
 
 
+@query_budget(8)
+@conditional_page(profile_validator)
+@anonymous_cache_page
 def profile(request, username):
     """Посты автора."""
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.select_related('group', 'author')
+    author = get_object_or_404(User.objects.select_related('stats'),
+                               username=username)
+    stats = user_stats(author)
+    post_list = hydrate_posts(author.posts)
     if request.user.is_authenticated:
         following = Follow.objects.filter(
             user=request.user,
             author=author).exists()
     else:
         following = False
+    page_obj = post_obj(request, post_list, COUNT_POST_ON_PAGE,
+                        lambda: stats.posts_count)
     context = {
         'author': author,
-        'page_obj': post_obj(request, post_list, COUNT_POST_ON_PAGE),
+        'stats': stats,
+        'page_obj': page_obj,
         'following': following,
+        **feed_cache('profile', page_obj, author.pk),
     }
-    return render(request, 'posts/profile.html', context)
+    response = render(request, 'posts/profile.html', context)
+    return tag_response(response, author_tag(author.pk))
 
 
+@query_budget(8)
+@conditional_page(post_detail_validator)
+@anonymous_cache_page
 def post_detail(request, post_id):
     """Страница поста."""
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(
+        hydrate_posts(Post.objects, 'author__stats'), id=post_id)
     form = CommentForm()
     comments = post.comments.select_related('author')
     context = {
         'post': post,
+        'author_stats': user_stats(post.author),
         'form': form,
         'comments': comments,
     }
-    return render(request, 'posts/post_detail.html', context)
+    response = render(request, 'posts/post_detail.html', context)
+    return tag_response(response, post_tag(post.pk),
+                        author_tag(post.author_id),
+                        group_tag(post.group_id))
 
 
+@query_budget(8)
+@anonymous_cache_page
+def search(request):
+    """Поиск постов по тексту."""
+    query = request.GET.get('q', '').strip()
+    results = SearchResults(query)
+    page_obj = post_obj(request, results, COUNT_POST_ON_PAGE)
+    context = {
+        'query': query,
+        'results': results,
+        'page_obj': page_obj,
+        'page_query': urlencode({'q': query}) + '&' if query else '',
+    }
+    response = render(request, 'posts/search.html', context)
+    return tag_response(response, FEED_TAG)
+
+
+@query_budget(18)
 @login_required
+@transaction.atomic
 def post_create(request):
     """Новый пост создать."""
     form = PostForm(request.POST or None,
@@ -68,16 +172,19 @@ def post_create(request):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        queue_thumbnails(post)
         return redirect('posts:profile', request.user.username)
     context = {'form': form}
     return render(request, 'posts/create_post.html', context)
 
 
+@query_budget(18)
 @login_required
+@transaction.atomic
 def post_edit(request, post_id):
     """Редактировать пост."""
     post = get_object_or_404(Post, id=post_id)
-    if post.author != request.user:
+    if post.author_id != request.user.pk:
         return redirect('posts:post_detail', post_id)
 
     form = PostForm(request.POST or None,
@@ -85,18 +192,22 @@ def post_edit(request, post_id):
                     instance=post)
     if form.is_valid():
         form.save()
+        if 'image' in form.changed_data:
+            queue_thumbnails(post)
         return redirect('posts:post_detail', post_id)
 
     context = {
         'form': form,
         'is_edit': True,
-        'author': post.author,
+        'author': request.user,
         'user': request.user,
     }
     return render(request, 'posts/create_post.html', context)
 
 
+@query_budget(8)
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
     """Комментировать пост."""
     post = get_object_or_404(Post, id=post_id)
@@ -109,17 +220,27 @@ def add_comment(request, post_id):
     return redirect(comment)
 
 
+@query_budget(10)
 @login_required
 def follow_index(request):
     """Лента подписок."""
-    post_list = Post.objects.filter(author__following__user=request.user)
+    if settings.POSTS_FOLLOW_FEED_ENGINE == 'merge':
+        post_list = MergedFeed(request.user)
+    else:
+        post_list = timeline_posts(request.user)
+    page_obj = post_obj(request, post_list, COUNT_POST_ON_PAGE,
+                        follow_counter(request.user), TIMELINE_ORDERING)
     context = {
-        'page_obj': post_obj(request, post_list, COUNT_POST_ON_PAGE),
+        'page_obj': page_obj,
+        **feed_cache('follow', page_obj, request.user.pk,
+                     tags=[follow_tag(request.user.pk)]),
     }
     return render(request, 'posts/follow.html', context)
 
 
+@query_budget(16)
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     """Подписаться на автора."""
     author = get_object_or_404(User, username=username)
@@ -130,7 +251,9 @@ def profile_follow(request, username):
     return redirect('posts:profile', username)
 
 
+@query_budget(11)
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     """Отписаться от автора."""
     author = get_object_or_404(User, username=username)
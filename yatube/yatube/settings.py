@@ -26,6 +26,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -124,3 +125,68 @@ CACHES = {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
+
+# Лента листается по курсору (pub_date, id) вместо номеров страниц
+POSTS_KEYSET_PAGINATION = False
+
+# Количество постов в ленте до этого значения кешируется точно,
+# большие значения приблизительны и обновляются раз в STALENESS секунд
+POSTS_COUNT_EXACT_LIMIT = 1000
+POSTS_COUNT_STALENESS = 60
+
+# Размер пачки при раскладке постов по лентам подписчиков
+POSTS_TIMELINE_BATCH_SIZE = 500
+
+# Посты авторов, у которых подписчиков больше этого числа,
+# не раскладываются по лентам, а подмешиваются при чтении
+POSTS_FANOUT_FOLLOWER_LIMIT = 10000
+
+# Как собирается лента подписок: 'timeline' читает разложенную ленту,
+# 'merge' сливает свежие посты каждого автора при чтении
+POSTS_FOLLOW_FEED_ENGINE = 'timeline'
+# Сколько постов автора читается за раз при слиянии
+POSTS_MERGE_BATCH_SIZE = 50
+
+# Время жизни фрагментов лент в кеше, версия лент сбрасывает их раньше
+POSTS_FEED_CACHE_TIMEOUT = 60 * 60
+
+# Время жизни страниц, закешированных для анонимных посетителей,
+# 0 отключает кеш. Страницы сбрасываются раньше по тегам данных
+ANONYMOUS_PAGE_CACHE_TIMEOUT = 60 * 60
+
+# Превышение бюджета запросов представления (см. core.middleware)
+# пишется в лог, а при включенной настройке вызывает исключение.
+# Тесты прогоняются в строгом режиме
+QUERY_BUDGET_STRICT = False
+TEST_RUNNER = 'core.testing.QueryBudgetRunner'
+
+# Потоки, в которых создаются миниатюры новых картинок постов,
+# 0 создает их сразу после сохранения поста
+POSTS_THUMBNAIL_WORKERS = 2
+
+# Загружаемые файлы проверяются по мере чтения запроса (см. posts.uploads),
+# файлы больше FILE_UPLOAD_MAX_MEMORY_SIZE пишутся во временный файл
+FILE_UPLOAD_HANDLERS = [
+    'posts.uploads.ImageUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+FILE_UPLOAD_MAX_MEMORY_SIZE = 1024 * 1024
+# Ограничения картинок постов: размер файла, число пикселей,
+# форматы Pillow и сколько байт начала файла ждать для заголовка
+POSTS_IMAGE_MAX_BYTES = 10 * 1024 * 1024
+POSTS_IMAGE_MAX_PIXELS = 40_000_000
+POSTS_IMAGE_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+POSTS_IMAGE_HEADER_BYTES = 256 * 1024
+
+# Файл картинки без ссылок удаляется, только если его не загружали снова
+# за это число секунд, иначе его удалит следующая проверка
+POSTS_IMAGE_DELETE_DELAY = 60
+
+# Без DEBUG файлы MEDIA_ROOT отдает core.views.serve_file. Заголовок,
+# с которым отдача передается фронтовому прокси: 'X-Accel-Redirect'
+# для nginx, 'X-Sendfile' для Apache; None - отдает сам Django
+SENDFILE_HEADER = None
+# Внутренний location nginx, к которому X-Accel-Redirect добавляет
+# адрес запроса: /protected/media/... -> MEDIA_ROOT
+SENDFILE_URL_PREFIX = '/protected'
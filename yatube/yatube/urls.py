@@ -1,7 +1,11 @@
+import re
+
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
+
+from core.views import serve_file
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -19,3 +23,13 @@ if settings.DEBUG:
     urlpatterns += static(
         settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
     )
+else:
+    urlpatterns += [
+        re_path(
+            rf'^{re.escape(url.lstrip("/"))}(?P<path>.*)$', serve_file,
+            {'document_root': document_root})
+        for url, document_root in (
+            (settings.MEDIA_URL, settings.MEDIA_ROOT),
+            (settings.STATIC_URL, settings.STATIC_ROOT))
+        if document_root
+    ]